@@ -0,0 +1,220 @@
+import hashlib
+import os
+import pickle
+import struct
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Any, Dict, Final, List, Optional, Tuple, Union
+
+from psa.config.rules import Config
+
+
+MAGIC: Final = b"PSAC"
+VERSION: Final = 2
+
+_HEADER: Final = struct.Struct("<4sH32s")
+_TMP_SUFFIX: Final = ".tmp"
+
+
+class ResultCache:
+    # Entries are only touched when their last use is older than this, so
+    # hot entries do not turn every hit into a metadata write.
+    TOUCH_INTERVAL: Final = 60.0
+    # Temp files this old belong to writers that died before renaming.
+    STALE_TMP_AGE: Final = 3600.0
+    # Eviction trims the cache to this fraction of max_size.
+    PRUNE_TARGET: Final = 0.9
+
+    def __init__(self, directory: Path, max_size: Optional[int] = None) -> None:
+        self.directory = directory
+        self.max_size = max_size
+        self._written = 0
+
+    @staticmethod
+    def key(source: bytes, fingerprint: str) -> str:
+        digest = hashlib.sha256(fingerprint.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(source)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+
+        payload = self._verify(data)
+        if payload is None:
+            self._discard(path)
+            return None
+
+        try:
+            results = pickle.loads(payload)
+        except (ValueError, EOFError, pickle.UnpicklingError):
+            self._discard(path)
+            return None
+
+        self._touch(path)
+        return results
+
+    def put(self, key: str, results: List[Dict[str, Any]]) -> None:
+        payload = pickle.dumps(results, pickle.HIGHEST_PROTOCOL)
+        data = _HEADER.pack(MAGIC, VERSION, hashlib.sha256(payload).digest())
+
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Readers, possibly on other machines, only ever see a complete
+        # entry: it is written under a unique name and renamed into place.
+        fd, tmp_name = tempfile.mkstemp(
+            dir=path.parent, prefix=f".{path.name}.", suffix=_TMP_SUFFIX
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.write(payload)
+            os.replace(tmp_name, path)
+        except BaseException:
+            self._discard(Path(tmp_name))
+            raise
+
+        # The directory is only scanned once writes since the last scan
+        # could have filled the room left by the previous prune. Every
+        # process counts its own writes, so worker processes prune after
+        # the entries they add themselves.
+        self._written += len(data) + len(payload)
+        if self.max_size and self._written > self.max_size * (1 - self.PRUNE_TARGET):
+            self.prune()
+
+    def prune(self) -> int:
+        self._written = 0
+        if not self.max_size:
+            return 0
+
+        now = time.time()
+        entries: List[Tuple[float, int, Path]] = []
+        total = 0
+
+        for path, stat in self._scan():
+            if path.name.endswith(_TMP_SUFFIX):
+                if now - stat.st_mtime > self.STALE_TMP_AGE:
+                    self._discard(path)
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if total <= self.max_size:
+            return 0
+
+        removed = 0
+        target = self.max_size * self.PRUNE_TARGET
+        for _, size, path in sorted(entries):
+            if total <= target:
+                break
+            self._discard(path)
+            total -= size
+            removed += 1
+
+        return removed
+
+    def _verify(self, data: bytes) -> Optional[bytes]:
+        if len(data) < _HEADER.size:
+            return None
+
+        magic, version, checksum = _HEADER.unpack_from(data)
+        payload = data[_HEADER.size :]
+        if magic != MAGIC or version != VERSION:
+            return None
+        if hashlib.sha256(payload).digest() != checksum:
+            return None
+
+        return payload
+
+    def _touch(self, path: Path) -> None:
+        try:
+            if time.time() - path.stat().st_mtime > self.TOUCH_INTERVAL:
+                os.utime(path)
+        except OSError:
+            pass
+
+    def _scan(self):
+        try:
+            buckets = list(os.scandir(self.directory))
+        except OSError:
+            return
+
+        for bucket in buckets:
+            if not bucket.is_dir(follow_symlinks=False):
+                continue
+            try:
+                with os.scandir(bucket.path) as entries:
+                    for entry in entries:
+                        try:
+                            yield Path(entry.path), entry.stat(follow_symlinks=False)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+    @staticmethod
+    def _discard(path: Path) -> None:
+        try:
+            path.unlink()
+        except OSError:
+            pass
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / key[2:]
+
+
+class MemoryCache:
+    # In-process stand-in for ResultCache, for long-running processes that
+    # keep results between analyses without touching the disk.
+    def __init__(self, max_entries: int = 4096) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = Lock()
+
+    key = staticmethod(ResultCache.key)
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            results = self._entries.get(key)
+            if results is None:
+                return None
+            self._entries.move_to_end(key)
+
+        return [dict(result) for result in results]
+
+    def put(self, key: str, results: List[Dict[str, Any]]) -> None:
+        copied = [dict(result) for result in results]
+
+        with self._lock:
+            self._entries[key] = copied
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def prune(self) -> int:
+        return 0
+
+
+Cache = Union[ResultCache, MemoryCache]
+
+
+def open_cache(
+    config: Config, directory: Optional[Path] = None
+) -> Optional[ResultCache]:
+    # The given directory, or the configured one when the cache is enabled,
+    # bounded by the configured size.
+    if directory is None and config.cache.enabled:
+        directory = Path(config.cache.directory)
+    if directory is None:
+        return None
+
+    return ResultCache(directory, max_size=config.cache.max_size_mb * 1024 * 1024)
@@ -47,6 +47,13 @@ class TCCConfig(RuleConfig):
     severity_high_tcc: Severity = Severity.WARNING
 
 
+@dataclass(frozen=True)
+class CacheConfig:
+    enabled: bool = False
+    directory: str = ".psa_cache"
+    max_size_mb: int = 512
+
+
 def from_dict(cls: Type[T], data: dict, nested: dict = None) -> T:
     field_names = {f.name for f in fields(cls)}
     filtered_data = {}
@@ -72,9 +79,12 @@ def from_dict(cls: Type[T], data: dict, nested: dict = None) -> T:
 class Config:
     fail_on_error: bool = True
     fail_on_warning: bool = False
+    # Parse files the prefilter skips, only to report their syntax errors.
+    check_syntax: bool = False
     lcom: LCOMConfig = field(default_factory=LCOMConfig)
     sife_effects: SideEffectConfig = field(default_factory=SideEffectConfig)
     tcc: TCCConfig = field(default_factory=TCCConfig)
+    cache: CacheConfig = field(default_factory=CacheConfig)
 
     @classmethod
     def from_yaml(cls, filepath: Union[str, Path]) -> "Config":
@@ -107,7 +117,9 @@ class Config:
         return cls(
             fail_on_error=settings.get("fail_on_error", True),
             fail_on_warning=settings.get("fail_on_warning", False),
+            check_syntax=settings.get("check_syntax", False),
             lcom=lcom_rules,
             sife_effects=se_rules,
             tcc=tcc_rules,
+            cache=from_dict(CacheConfig, data.get("cache", {})),
         )
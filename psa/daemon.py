@@ -0,0 +1,297 @@
+import gc
+import json
+import socket
+import socketserver
+import time
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from psa.cache import Cache, MemoryCache, ResultCache
+from psa.config.rules import Config
+from psa.pipeline import Pipeline
+from psa.results import build_diffs, encode_value
+from psa.rules.engine import RuleEngine
+from psa.runner import FileOutcome, _process_file, get_warm_pool
+
+
+FileResults = List[Dict[str, Any]]
+# (mtime in ns, size, inode): any write to a file changes one of these.
+Signature = Tuple[int, int, int]
+
+
+@dataclass
+class _FileState:
+    signature: Signature
+    results: FileResults
+
+
+class Workspace:
+    def __init__(
+        self,
+        config: Config,
+        root: Path,
+        cache: Optional[Cache] = None,
+        jobs: int = 1,
+    ) -> None:
+        self.config = config
+        # Files are tracked under the resolved root, so the resolved paths
+        # that queries name are looked up directly.
+        self.root = root.resolve()
+        self.jobs = jobs
+        # The memory cache keeps per-entity results of every file, so an
+        # edit re-analyzes only the classes and functions it touched.
+        self.pipeline = Pipeline(config, root, cache=cache or MemoryCache())
+        # Workers can only share a cache that lives on disk.
+        self._shared_cache = cache if isinstance(cache, ResultCache) else None
+
+        self._files: Dict[Path, _FileState] = {}
+        self._lock = Lock()
+        self.last_refresh: Optional[float] = None
+
+    def refresh(self, paths: Optional[List[Path]] = None) -> List[Path]:
+        # Stats the given files, or every file of the tree, and re-processes
+        # those whose signature changed; an unchanged file costs one stat.
+        with self._lock:
+            if paths is None:
+                candidates = sorted(self.root.rglob("*.py"))
+            else:
+                candidates = [
+                    path
+                    for path in self._resolve(paths)
+                    if path.suffix == ".py" and path.is_relative_to(self.root)
+                ]
+
+            seen: Dict[Path, Signature] = {}
+            for path in candidates:
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                seen[path] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+            tracked = self._files.keys() if paths is None else candidates
+            for path in set(tracked) - seen.keys():
+                self._files.pop(path, None)
+
+            changed = [
+                path
+                for path, signature in seen.items()
+                if path not in self._files or self._files[path].signature != signature
+            ]
+            added = any(path not in self._files for path in changed)
+            for path, (results, _) in zip(changed, self._process(changed)):
+                self._files[path] = _FileState(seen[path], results)
+
+            if added:
+                self._files = dict(sorted(self._files.items()))
+            if paths is None:
+                self.last_refresh = time.time()
+
+            return changed
+
+    def _process(self, paths: List[Path]) -> List[FileOutcome]:
+        if self.jobs < 2 or len(paths) < 2:
+            return [_process_file(self.pipeline, path) for path in paths]
+
+        # Many files change at once on startup, a checkout or a pull. They
+        # go to a pool of preloaded workers that lives as long as the
+        # daemon. A pool that lost a worker is replaced on the next refresh.
+        pool = get_warm_pool(
+            self.config, self.root, self.jobs, cache=self._shared_cache
+        )
+        try:
+            return list(pool.map_files(paths))
+        except BrokenProcessPool:
+            return [_process_file(self.pipeline, path) for path in paths]
+
+    def results(self, paths: Optional[List[Path]] = None) -> FileResults:
+        with self._lock:
+            selected = self._select(paths)
+            return [result for path in selected for result in self._files[path].results]
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "root": str(self.root),
+                "files": len(self._files),
+                "results": sum(len(s.results) for s in self._files.values()),
+                "last_refresh": self.last_refresh,
+            }
+
+    def _select(self, paths: Optional[List[Path]]) -> List[Path]:
+        if paths is None:
+            return list(self._files)
+        return [path for path in self._resolve(paths) if path in self._files]
+
+    def _resolve(self, paths: List[Path]) -> List[Path]:
+        # Relative paths are taken relative to the root.
+        return sorted({(self.root / path).resolve() for path in paths})
+
+
+class Daemon:
+    def __init__(
+        self, workspace: Workspace, socket_path: Path, interval: float = 0.5
+    ) -> None:
+        self.workspace = workspace
+        self.socket_path = socket_path
+        self.interval = interval
+
+        self._stopped = Event()
+        self._methods: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "status": self._status,
+            "results": self._results,
+            "check": self._check,
+            "shutdown": self._shutdown,
+        }
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+
+    def serve(self) -> None:
+        self.workspace.refresh()
+        # Everything loaded so far lives as long as the daemon; keeping it
+        # out of the collector's generations stops full collections from
+        # rescanning it in the middle of a query.
+        gc.freeze()
+
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        self._server = _Server(str(self.socket_path), _Handler, self)
+
+        watcher = Thread(target=self._watch, daemon=True)
+        watcher.start()
+        try:
+            self._server.serve_forever()
+        finally:
+            self._stopped.set()
+            self._server.server_close()
+            self.socket_path.unlink(missing_ok=True)
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._server is not None:
+            self._server.shutdown()
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        method = self._methods.get(request.get("method"))
+        if method is None:
+            return {"error": f"unknown method {request.get('method')!r}"}
+
+        try:
+            return {"result": method(request.get("params") or {})}
+        except Exception as e:
+            return {"error": str(e)}
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.interval):
+            self.workspace.refresh()
+
+    def _fresh_results(self, params: Dict[str, Any]) -> FileResults:
+        # Queries see every change saved before they were sent, even ones
+        # the poller has not picked up yet. Only the files a query names are
+        # checked; changes elsewhere are left to the poller.
+        paths = params.get("paths")
+        if paths is not None:
+            paths = [Path(path) for path in paths]
+
+        self.workspace.refresh(paths)
+        return self.workspace.results(paths)
+
+    def _status(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return self.workspace.status()
+
+    def _results(self, params: Dict[str, Any]) -> List[Any]:
+        return [encode_value(dict(result)) for result in self._fresh_results(params)]
+
+    def _check(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        results = self._fresh_results(params)
+
+        engine = RuleEngine(self.workspace.config)
+        violations = engine.check_all(build_diffs(results))
+
+        return {
+            "fail": engine.should_fail(),
+            "errors": [
+                {"file_path": r["file_path"], "error": r["error"]}
+                for r in results
+                if "error" in r
+            ],
+            "violations": [
+                {
+                    "rule_id": v.rule_id,
+                    "severity": v.severity.value,
+                    "message": v.message,
+                    "file_path": v.context.get("file_path"),
+                    "line_number": v.context.get("line_number"),
+                }
+                for v in violations
+            ],
+        }
+
+    def _shutdown(self, params: Dict[str, Any]) -> bool:
+        # The server is stopped by the handler once this response is out.
+        self._stopped.set()
+        return True
+
+    @property
+    def stopping(self) -> bool:
+        return self._stopped.is_set()
+
+
+class _Server(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, address: str, handler, daemon: Daemon) -> None:
+        self.psa_daemon = daemon
+        super().__init__(address, handler)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    # One JSON request per line, answered by one JSON line.
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {"error": f"invalid request: {e}"}
+            else:
+                response = self.server.psa_daemon.handle(request)
+
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+            if self.server.psa_daemon.stopping:
+                self.server.psa_daemon.stop()
+                return
+
+
+def query(
+    socket_path: Path, method: str, params: Optional[Dict[str, Any]] = None
+) -> Any:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(str(socket_path))
+        request = {"method": method, "params": params or {}}
+        sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+
+        with sock.makefile("rb") as stream:
+            response = json.loads(stream.readline())
+
+    if "error" in response:
+        raise RuntimeError(response["error"])
+    return response["result"]
+
+
+def default_socket_path(root: Path) -> Path:
+    return root / ".psa.sock"
+
+
+def find_socket(start: Path) -> Optional[Path]:
+    # The socket of the daemon serving `start` or the nearest tree above
+    # it, found the way git finds .git.
+    start = start.resolve()
+    for directory in (start, *start.parents):
+        path = default_socket_path(directory)
+        if path.is_socket():
+            return path
+    return None
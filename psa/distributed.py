@@ -0,0 +1,252 @@
+import multiprocessing
+import time
+from collections import deque
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Connection, Listener
+from pathlib import Path
+from threading import Condition, Thread
+from typing import Any, Callable, Deque, Dict, Final, List, Optional, Tuple, Union
+
+from psa.cache import ResultCache
+from psa.config.rules import Config
+from psa.pipeline import Pipeline
+
+
+Address = Union[Tuple[str, int], str]
+FileResults = List[Dict[str, Any]]
+
+
+class Coordinator:
+    # How often serve() asks whether any worker is still alive.
+    LIVENESS_INTERVAL: Final = 0.5
+
+    def __init__(
+        self,
+        root: Path,
+        files: List[Path],
+        address: Address,
+        authkey: bytes,
+        batch_size: int = 32,
+    ) -> None:
+        self.root = root
+        self.files = files
+
+        self._paths = [self._relative(path) for path in files]
+        self._batches = [
+            range(start, min(start + batch_size, len(files)))
+            for start in range(0, len(files), batch_size)
+        ]
+        self._pending: Deque[int] = deque(range(len(self._batches)))
+        self._results: Dict[int, List[FileResults]] = {}
+        self._cond = Condition()
+
+        self._listener = Listener(address, authkey=authkey)
+
+    @property
+    def address(self) -> Address:
+        return self._listener.address
+
+    def serve(
+        self,
+        timeout: Optional[float] = None,
+        alive: Optional[Callable[[], bool]] = None,
+    ) -> List[FileResults]:
+        # Fails once `timeout` seconds have passed, or once `alive` says no
+        # worker is left to finish the remaining batches.
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        acceptor = Thread(target=self._accept, daemon=True)
+        acceptor.start()
+
+        try:
+            with self._cond:
+                while not self._finished():
+                    wait = self.LIVENESS_INTERVAL if alive is not None else None
+                    if deadline is not None:
+                        left = deadline - time.monotonic()
+                        if left <= 0:
+                            raise TimeoutError(
+                                f"{self._remaining()} batches were not "
+                                f"completed within {timeout}s"
+                            )
+                        wait = left if wait is None else min(wait, left)
+                    if alive is not None and not alive():
+                        raise RuntimeError(
+                            f"all workers exited with {self._remaining()} "
+                            f"batches not completed"
+                        )
+                    self._cond.wait(wait)
+        finally:
+            self._listener.close()
+
+        return [
+            file_results
+            for batch_id in range(len(self._batches))
+            for file_results in self._results[batch_id]
+        ]
+
+    def _finished(self) -> bool:
+        return len(self._results) == len(self._batches)
+
+    def _remaining(self) -> int:
+        return len(self._batches) - len(self._results)
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                conn = self._listener.accept()
+            except AuthenticationError:
+                # A client with the wrong key; others may still connect.
+                continue
+            except OSError:
+                return
+
+            Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn: Connection) -> None:
+        batch_id: Optional[int] = None
+
+        try:
+            while True:
+                if conn.recv() != ("ready",):
+                    return
+
+                batch_id = self._take_batch()
+                if batch_id is None:
+                    conn.send(("done",))
+                    return
+
+                batch = self._batches[batch_id]
+                conn.send(("batch", batch_id, [self._paths[i] for i in batch]))
+
+                file_results: List[FileResults] = [[] for _ in batch]
+                while True:
+                    message = conn.recv()
+                    if message[0] == "batch_done":
+                        break
+
+                    _, position, results = message
+                    file_path = str(self.files[batch[position]])
+                    for result in results:
+                        result["file_path"] = file_path
+                    file_results[position] = results
+
+                with self._cond:
+                    self._results[batch_id] = file_results
+                    self._cond.notify_all()
+                batch_id = None
+
+        except (EOFError, OSError):
+            pass
+
+        finally:
+            conn.close()
+            if batch_id is not None:
+                self._requeue(batch_id)
+
+    def _take_batch(self) -> Optional[int]:
+        with self._cond:
+            self._cond.wait_for(lambda: self._pending or self._finished())
+            if self._pending:
+                return self._pending.popleft()
+            return None
+
+    def _requeue(self, batch_id: int) -> None:
+        with self._cond:
+            if batch_id not in self._results:
+                self._pending.appendleft(batch_id)
+                self._cond.notify_all()
+
+    def _relative(self, path: Path) -> str:
+        try:
+            return path.relative_to(self.root).as_posix()
+        except ValueError:
+            return path.as_posix()
+
+
+class Worker:
+    def __init__(
+        self,
+        config: Config,
+        root: Path,
+        address: Address,
+        authkey: bytes,
+        entity_jobs: int = 1,
+        cache: Optional[ResultCache] = None,
+    ) -> None:
+        self.root = root
+        self.address = address
+        self.authkey = authkey
+        self.pipeline = Pipeline(config, root, entity_jobs, cache)
+
+    def serve(self) -> int:
+        batches = 0
+
+        with Client(self.address, authkey=self.authkey) as conn:
+            while True:
+                try:
+                    conn.send(("ready",))
+                    message = conn.recv()
+                except (EOFError, ConnectionError):
+                    # The coordinator exits once every batch is in, possibly
+                    # before telling the workers waiting for more.
+                    return batches
+                if message[0] == "done":
+                    return batches
+
+                _, batch_id, paths = message
+                for position, path in enumerate(paths):
+                    conn.send(("file", position, self._process(self.root / path)))
+                conn.send(("batch_done", batch_id))
+
+                batches += 1
+
+    def _process(self, file_path: Path) -> FileResults:
+        try:
+            return self.pipeline.process_file(file_path)
+        except Exception as e:
+            return [
+                {
+                    "file_path": str(file_path),
+                    "error": str(e),
+                }
+            ]
+
+
+def _serve_worker(config: Config, root: Path, address: Address, authkey: bytes):
+    Worker(config, root, address, authkey).serve()
+
+
+def run_local(
+    config: Config,
+    root: Path,
+    files: List[Path],
+    workers: int,
+    batch_size: int = 32,
+    timeout: Optional[float] = None,
+) -> List[FileResults]:
+    authkey = multiprocessing.current_process().authkey
+    coordinator = Coordinator(
+        root, files, ("127.0.0.1", 0), authkey, batch_size=batch_size
+    )
+
+    processes = [
+        multiprocessing.Process(
+            target=_serve_worker,
+            args=(config, root, coordinator.address, authkey),
+            daemon=True,
+        )
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        return coordinator.serve(
+            timeout, alive=lambda: any(process.is_alive() for process in processes)
+        )
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
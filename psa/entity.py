@@ -1,10 +1,10 @@
 import ast
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 
 if TYPE_CHECKING:
-    from psa.nodes import ExprInfo
+    from psa.nodes import CallSummaries, ExprInfo
     from psa.index.scopes import Scope
 
 
@@ -69,8 +69,24 @@ class NonlocalDeclEntity(CodeEntity):
 
 @dataclass(slots=True, kw_only=True)
 class CallEntity(CodeEntity):
-    args: List["ExprInfo"] = field(default_factory=list)
-    keywords: Dict[str, "ExprInfo"] = field(default_factory=dict)
     scope: "Scope" = field(repr=False)
     is_method_call: bool = False
     receiver: Optional[str] = None
+    # Only built for analyzers that require Feature.CALL_ARGS.
+    summaries: Optional["CallSummaries"] = field(default=None, repr=False)
+
+    @property
+    def args(self) -> List["ExprInfo"]:
+        return self._summaries()[0]
+
+    @property
+    def keywords(self) -> Dict[str, "ExprInfo"]:
+        return self._summaries()[1]
+
+    def _summaries(self) -> Tuple[List["ExprInfo"], Dict[str, "ExprInfo"]]:
+        if self.summaries is None:
+            raise RuntimeError(
+                "call arguments were not summarized, an analyzer that reads "
+                "them must require Feature.CALL_ARGS"
+            )
+        return self.summaries.resolve()
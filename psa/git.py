@@ -0,0 +1,196 @@
+import subprocess
+from pathlib import Path
+from threading import Lock
+from typing import IO, List, NamedTuple, Optional
+
+
+class GitError(Exception):
+    pass
+
+
+class ChangedFile(NamedTuple):
+    path: str
+    # Path of the same file at the base revision, None if it is new there.
+    base_path: Optional[str]
+
+
+def _git(root: Path, *args: str) -> bytes:
+    try:
+        completed = subprocess.run(
+            ["git", *args], cwd=root, capture_output=True, check=True
+        )
+    except FileNotFoundError:
+        raise GitError("git executable not found")
+    except subprocess.CalledProcessError as e:
+        message = e.stderr.decode("utf-8", "replace").strip()
+        raise GitError(f"git {args[0]} failed: {message}")
+
+    return completed.stdout
+
+
+def resolve_revision(root: Path, rev: str) -> str:
+    return _git(root, "rev-parse", "--verify", f"{rev}^{{commit}}").decode().strip()
+
+
+def changed_files(root: Path, base: str) -> List[ChangedFile]:
+    # Paths are relative to root and limited to it, compared against the
+    # working tree (including untracked files) with rename detection so
+    # that a moved file is still compared with its previous version.
+    output = _git(
+        root,
+        "diff",
+        "--name-status",
+        "-z",
+        "-M",
+        "--relative",
+        "--no-ext-diff",
+        base,
+        "--",
+        ".",
+    )
+    fields = output.decode("utf-8", "surrogateescape").split("\0")
+
+    changes: List[ChangedFile] = []
+    i = 0
+    while i < len(fields) - 1:
+        status = fields[i]
+        if status[0] in "RC":
+            old, new = fields[i + 1], fields[i + 2]
+            changes.append(ChangedFile(new, old if status[0] == "R" else None))
+            i += 3
+            continue
+
+        path = fields[i + 1]
+        if status[0] != "D":
+            changes.append(ChangedFile(path, None if status[0] == "A" else path))
+        i += 2
+
+    untracked = _git(root, "ls-files", "-z", "--others", "--exclude-standard")
+    for path in untracked.decode("utf-8", "surrogateescape").split("\0"):
+        if path:
+            changes.append(ChangedFile(path, None))
+
+    changes.sort()
+    return changes
+
+
+class Commit(NamedTuple):
+    oid: str
+    timestamp: int
+
+
+class TreeEntry(NamedTuple):
+    path: str
+    oid: str
+
+
+def log_commits(root: Path, rev: str, count: int) -> List[Commit]:
+    # Newest first, following the first parent so that merged branches do
+    # not interleave with the history of the target branch.
+    output = _git(
+        root, "log", "--first-parent", f"--max-count={count}", "--format=%H %ct", rev
+    )
+    commits = []
+    for line in output.decode("ascii").splitlines():
+        oid, timestamp = line.split()
+        commits.append(Commit(oid, int(timestamp)))
+    return commits
+
+
+def list_blobs(root: Path, rev: str) -> List[TreeEntry]:
+    # Regular files under root at rev, with paths relative to root.
+    output = _git(root, "ls-tree", "-r", "-z", rev, "--", ".")
+
+    entries = []
+    for item in output.decode("utf-8", "surrogateescape").split("\0"):
+        if not item:
+            continue
+        info, path = item.split("\t", 1)
+        mode, kind, oid = info.split()
+        if kind == "blob" and mode in ("100644", "100755"):
+            entries.append(TreeEntry(path, oid))
+    return entries
+
+
+class ObjectReader:
+    # One `git cat-file --batch` process serves every read, so reading a
+    # blob costs a round trip over a pipe rather than a process start.
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._process: Optional[subprocess.Popen] = None
+        self._lock = Lock()
+
+    def read(self, spec: str) -> bytes:
+        if "\n" in spec:
+            raise GitError(f"cannot read {spec!r} in batch mode")
+
+        with self._lock:
+            process = self._start()
+            process.stdin.write(spec.encode("utf-8", "surrogateescape") + b"\n")
+            process.stdin.flush()
+
+            header = process.stdout.readline()
+            if not header:
+                self._stop()
+                raise GitError("git cat-file exited unexpectedly")
+
+            # "<spec> missing" and "<spec> ambiguous" echo the spec, which
+            # may itself contain spaces; the object header never does.
+            line = header.rstrip(b"\n")
+            parts = line.split()
+            if (
+                line.endswith((b" missing", b" ambiguous"))
+                or len(parts) != 3
+                or not parts[2].isdigit()
+            ):
+                raise GitError(line.decode("utf-8", "replace"))
+
+            _, kind, size = parts
+            content = _read_exactly(process.stdout, int(size) + 1)[:-1]
+
+        if kind != b"blob":
+            raise GitError(f"{spec} is a {kind.decode()}, not a blob")
+        return content
+
+    def read_file(self, rev: str, path: str) -> bytes:
+        # "./" makes git resolve the path relative to root instead of the
+        # top of the repository.
+        return self.read(f"{rev}:./{path}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._stop()
+
+    def __enter__(self) -> "ObjectReader":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _start(self) -> subprocess.Popen:
+        if self._process is None:
+            try:
+                self._process = subprocess.Popen(
+                    ["git", "cat-file", "--batch"],
+                    cwd=self.root,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                )
+            except FileNotFoundError:
+                raise GitError("git executable not found")
+        return self._process
+
+    def _stop(self) -> None:
+        if self._process is not None:
+            self._process.stdin.close()
+            self._process.wait()
+            self._process.stdout.close()
+            self._process = None
+
+
+def _read_exactly(stream: IO[bytes], size: int) -> bytes:
+    data = stream.read(size)
+    if len(data) != size:
+        raise GitError("git cat-file output ended early")
+    return data
@@ -0,0 +1,135 @@
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+from psa.git import Commit, ObjectReader, TreeEntry, list_blobs, log_commits
+from psa.metrics.lcom import LCOM
+from psa.metrics.side_effect import SideEffect
+from psa.metrics.tcc import TCC
+from psa.pipeline import Pipeline
+
+
+FileResults = List[Dict[str, Any]]
+
+
+@dataclass
+class Totals:
+    files: int = 0
+    errors: int = 0
+    # Counted per metric, as ignore globs and disabled analyzers may leave
+    # a class with only one of them.
+    lcom_classes: int = 0
+    tcc_classes: int = 0
+    lcom_sum: float = 0.0
+    tcc_sum: float = 0.0
+    functions: int = 0
+    writes: int = 0
+    arg_mutations: int = 0
+
+    @classmethod
+    def of(cls, results: FileResults) -> "Totals":
+        totals = cls(files=1)
+        for result in results:
+            if "error" in result:
+                totals.errors += 1
+                continue
+
+            value = result["value"]
+            if isinstance(value, LCOM):
+                totals.lcom_classes += 1
+                totals.lcom_sum += value.lcom_value
+            elif isinstance(value, TCC):
+                totals.tcc_classes += 1
+                totals.tcc_sum += value.tcc_value
+            elif isinstance(value, SideEffect):
+                totals.functions += 1
+                totals.writes += len(value.writes)
+                totals.arg_mutations += len(value.arg_mutates)
+
+        return totals
+
+    def add(self, other: "Totals") -> None:
+        for f in fields(self):
+            setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "files": self.files,
+            "errors": self.errors,
+            "classes": max(self.lcom_classes, self.tcc_classes),
+            "mean_lcom": (
+                self.lcom_sum / self.lcom_classes if self.lcom_classes else 0.0
+            ),
+            "mean_tcc": self.tcc_sum / self.tcc_classes if self.tcc_classes else 0.0,
+            "functions": self.functions,
+            "writes": self.writes,
+            "arg_mutations": self.arg_mutations,
+        }
+
+
+class History:
+    def __init__(self, pipeline: Pipeline, root: Path) -> None:
+        self.pipeline = pipeline
+        self.root = root
+
+        # Results per blob id and plan fingerprint: a file that is unchanged
+        # between commits is the same blob, so it is read, parsed and
+        # analyzed only once, unless it moves to a path where other
+        # analyzers apply.
+        self._blobs: Dict[Tuple[str, str], Tuple[FileResults, Totals]] = {}
+        self._reader = ObjectReader(root)
+
+    def commits(self, rev: str, count: int) -> List[Commit]:
+        # Oldest first, the natural order for a trend.
+        return log_commits(self.root, rev, count)[::-1]
+
+    def analyze(self, commit: Commit) -> Totals:
+        totals = Totals()
+        for entry in self._python_blobs(commit):
+            totals.add(self._blob(entry.oid, entry.path)[1])
+        return totals
+
+    def results(self, commit: Commit) -> FileResults:
+        results: FileResults = []
+        for entry in self._python_blobs(commit):
+            file_path = str(self.root / entry.path)
+            module_name = self.pipeline.extractor.module_name(Path(entry.path))
+            for result in self._blob(entry.oid, entry.path)[0]:
+                result = dict(result, file_path=file_path)
+                if "error" not in result:
+                    result["module"] = module_name
+                results.append(result)
+        return results
+
+    def run(self, rev: str, count: int) -> Iterator[Tuple[Commit, Totals]]:
+        for commit in self.commits(rev, count):
+            yield commit, self.analyze(commit)
+
+    @property
+    def distinct_blobs(self) -> int:
+        return len(self._blobs)
+
+    def close(self) -> None:
+        self._reader.close()
+
+    def _python_blobs(self, commit: Commit) -> List[TreeEntry]:
+        return [
+            entry
+            for entry in list_blobs(self.root, commit.oid)
+            if entry.path.endswith(".py")
+            and not self.pipeline.plan.excludes(self.root / entry.path)
+        ]
+
+    def _blob(self, oid: str, path: str) -> Tuple[FileResults, Totals]:
+        file_path = self.root / path
+        key = (oid, self.pipeline.plan.for_path(file_path).fingerprint)
+        entry = self._blobs.get(key)
+        if entry is None:
+            try:
+                source = self._reader.read(oid)
+                results = self.pipeline.process_source(source, file_path)
+            except Exception as e:
+                results = [{"file_path": str(file_path), "error": str(e)}]
+
+            entry = self._blobs[key] = (results, Totals.of(results))
+        return entry
@@ -2,19 +2,51 @@ import ast
 from pathlib import Path
 from typing import Optional, Tuple
 
+from psa.git import ObjectReader
+
 
 class Extractor:
     def __init__(self, root_path: Optional[Path] = None) -> None:
         self.root_path = root_path
 
-    def extract_file(self, path: Path) -> Tuple[ast.Module, str]:
-        tree = ast.parse(path.read_text(), filename=str(path))
-        module_name = path.stem
+    def read_source(self, path: Path) -> bytes:
+        return path.read_bytes()
+
+    def module_name(self, path: Path) -> str:
+        return path.stem
+
+    def parse_source(self, source: bytes, path: Path) -> Tuple[ast.Module, str]:
+        tree = ast.parse(source, filename=str(path))
+        module_name = self.module_name(path)
         return tree, module_name
 
+    def extract_file(self, path: Path) -> Tuple[ast.Module, str]:
+        return self.parse_source(self.read_source(path), path)
+
     def extract_dir(self, path: Path):
         modules = []
         for py_file in path.rglob("*.py"):
             module = self.extract_file(py_file)
             modules.append(module)
         return modules
+
+
+class GitBlobExtractor(Extractor):
+    # Reads files as of a revision straight from the object database; paths
+    # are still given as working-tree paths under root_path.
+    def __init__(
+        self,
+        root_path: Path,
+        revision: str,
+        reader: Optional[ObjectReader] = None,
+    ) -> None:
+        super().__init__(root_path)
+        self.revision = revision
+        self._reader = reader or ObjectReader(root_path)
+
+    def read_source(self, path: Path) -> bytes:
+        relative = path.relative_to(self.root_path).as_posix()
+        return self._reader.read_file(self.revision, relative)
+
+    def close(self) -> None:
+        self._reader.close()
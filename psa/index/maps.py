@@ -1,5 +1,18 @@
-from itertools import count
-from typing import List, Optional, Protocol, Set, TypeAlias, TypeVar, runtime_checkable
+import ast
+from dataclasses import dataclass, field, fields
+from enum import Enum
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Protocol,
+    Set,
+    Tuple,
+    TypeAlias,
+    TypeVar,
+    Union,
+    runtime_checkable,
+)
 from psa.entity import CallEntity, CodeEntity
 from psa.index.scopes import Scope
 
@@ -10,6 +23,18 @@ V = TypeVar("V", covariant=True)
 ID: TypeAlias = int
 
 
+class Feature(Enum):
+    # Optional parts of an index, built only when an enabled analyzer lists
+    # them in its `requires`.
+    CALLS = "calls"
+    # Argument summaries of calls; implies CALLS.
+    CALL_ARGS = "call_args"
+    # FuncFacts fields the function metrics read.
+    FUNC_FACTS = "func_facts"
+    # ClassFacts, and the FuncFacts fields about self the class metrics read.
+    CLASS_FACTS = "class_facts"
+
+
 @runtime_checkable
 class Indexable(Protocol[K, V]):
     def get(self, key: K) -> Optional[V]: ...
@@ -78,6 +103,84 @@ class DataflowMap(Indexable[ID, Set[ID]]):
         return self.dataflow_map.get(key, None)
 
 
+@dataclass
+class FuncFacts:
+    # What the function metrics need from a function's subtree, nested
+    # functions, classes and lambdas included. Names are kept raw and are
+    # classified against the function's declarations when it is analyzed.
+    # The first three fields are only filled for Feature.FUNC_FACTS, the
+    # rest only for Feature.CLASS_FACTS.
+    names_written: Set[str] = field(default_factory=set)
+    # (object, attribute) assignment targets, "__setitem__" for obj[...] = ...
+    attrs_written: Set[Tuple[str, str]] = field(default_factory=set)
+    attrs_loaded: Set[Tuple[str, str]] = field(default_factory=set)
+    # (attribute, "read" | "write" | "del") of self.<attribute>.
+    self_attrs: Set[Tuple[str, str]] = field(default_factory=set)
+    # (attribute, "read" | "write") of self.__dict__[...] and vars(self)[...].
+    dict_attrs: Set[Tuple[str, str]] = field(default_factory=set)
+    # (attribute, "read" | "write") of getattr/setattr/delattr(self, ...) and
+    # vars(self).get(...).
+    dynamic_attrs: Set[Tuple[str, str]] = field(default_factory=set)
+
+    def merge(self, other: "FuncFacts") -> None:
+        for f in fields(self):
+            getattr(self, f.name).update(getattr(other, f.name))
+
+
+@dataclass
+class ClassFacts:
+    # (property name, attribute it returns) for every property in the class
+    # subtree, in source order so that a later definition wins.
+    properties: List[Tuple[str, str]] = field(default_factory=list)
+
+    def merge(self, other: "ClassFacts") -> None:
+        self.properties.extend(other.properties)
+
+
+Facts: TypeAlias = Union[FuncFacts, ClassFacts]
+
+
+class FactsMap(Indexable[ID, Facts]):
+    def __init__(self) -> None:
+        self.facts_map: dict[ID, Facts] = {}
+
+    def add(self, node_id: ID, facts: Facts) -> None:
+        self.facts_map[node_id] = facts
+
+    def get(self, key: ID) -> Optional[Facts]:
+        return self.facts_map.get(key, None)
+
+
+# (node type, first line, first column, last line, last column)
+Position: TypeAlias = Tuple[str, int, int, int, int]
+
+
+class NodeIds:
+    # The single source of node ids of a file. Ids are keyed by the position
+    # of the node in the source, so asking twice for the same node gives the
+    # same id, and parsing the same source again (in another run or another
+    # process) gives every node the id it had before. Ids are dense, in the
+    # order nodes are first seen, and unique only within their file.
+    def __init__(self) -> None:
+        self._ids: Dict[Position, ID] = {}
+
+    def __call__(self, node: ast.AST) -> ID:
+        position = (
+            type(node).__name__,
+            getattr(node, "lineno", 0),
+            getattr(node, "col_offset", 0),
+            getattr(node, "end_lineno", 0),
+            getattr(node, "end_col_offset", 0),
+        )
+        node_id = self._ids.get(position)
+        if node_id is None:
+            node_id = self._ids[position] = len(self._ids) + 1
+        return node_id
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
 class Index:
     def __init__(self) -> None:
         self.node_map = NodeMap()
@@ -85,8 +188,18 @@ class Index:
         self.scope_map = ScopeMap()
         self.call_map = CallMap()
         self.dataflow_map = DataflowMap()
+        self.facts_map = FactsMap()
+
+        self.node_id = NodeIds()
+
+    def qualname(self, entity: CodeEntity) -> str:
+        # Dotted path of enclosing definitions below the module, which
+        # identifies an entity across revisions where node ids do not.
+        names = [entity.name]
+        parent_id = self.children_map.parent_map.get(entity.node_id)
 
-        self._node_id_gen = count(1)
+        while parent_id in self.children_map.parent_map:
+            names.append(self.node_map.get(parent_id).name)
+            parent_id = self.children_map.parent_map[parent_id]
 
-    def next_node_id(self) -> int:
-        return next(self._node_id_gen)
+        return ".".join(reversed(names))
@@ -0,0 +1,58 @@
+import codecs
+import re
+from typing import TYPE_CHECKING, Final, FrozenSet, Iterable, Optional
+
+if TYPE_CHECKING:
+    from psa.metrics.base import Analyzer
+
+
+# The encoding declaration of PEP 263, found on the first or second line.
+_COOKIE: Final = re.compile(rb"^[ \t\f]*#.*?coding[:=][ \t]*([-\w.]+)", re.MULTILINE)
+
+# Encodings in which an ASCII letter is always the same single byte, so a
+# keyword in the source is a keyword in the bytes.
+_PLAIN_ENCODINGS: Final = frozenset(
+    {"utf-8", "utf-8-sig", "ascii", "iso8859-1", "cp1252"}
+)
+
+_LINE_END: Final = re.compile(rb"\r\n?|\n")
+
+
+class SourceFilter:
+    # A test on the raw bytes of a file, run before it is parsed, that rules
+    # out files none of the analyzers could report on. It only ever errs
+    # towards parsing: a marker inside a string or comment lets a file
+    # through, and without markers from every analyzer nothing is skipped.
+    def __init__(self, markers: Optional[Iterable[bytes]]) -> None:
+        self.markers: Optional[FrozenSet[bytes]] = (
+            frozenset(markers) if markers is not None else None
+        )
+
+    @classmethod
+    def for_analyzers(cls, analyzers: Iterable["Analyzer"]) -> "SourceFilter":
+        markers = set()
+        for analyzer in analyzers:
+            if analyzer.source_markers is None:
+                return cls(None)
+            markers.update(analyzer.source_markers)
+        return cls(markers)
+
+    def may_match(self, source: bytes) -> bool:
+        if self.markers is None:
+            return True
+        if any(marker in source for marker in self.markers):
+            return True
+        return not _is_plain(source)
+
+
+def _is_plain(source: bytes) -> bool:
+    head = b"\n".join(_LINE_END.split(source, 2)[:2])
+    cookie = _COOKIE.search(head)
+    if cookie is None:
+        return True
+
+    try:
+        encoding = codecs.lookup(cookie.group(1).decode("ascii")).name
+    except (LookupError, UnicodeDecodeError):
+        return False
+    return encoding in _PLAIN_ENCODINGS
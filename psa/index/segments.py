@@ -0,0 +1,36 @@
+import ast
+import hashlib
+from itertools import accumulate
+from typing import List
+
+from psa.entity import CodeEntity, FunctionEntity
+
+
+class SegmentHasher:
+    def __init__(self, source: bytes) -> None:
+        self.source = source
+
+        # Byte offset of the start of every line; ast positions are 1-based
+        # lines with UTF-8 byte columns, so they index straight into source.
+        self._line_starts: List[int] = [0]
+        self._line_starts.extend(
+            accumulate(len(line) for line in source.splitlines(keepends=True))
+        )
+
+    def segment(self, node: ast.AST) -> bytes:
+        decorators = getattr(node, "decorator_list", None)
+        first_line = decorators[0].lineno if decorators else node.lineno
+
+        start = self._line_starts[first_line - 1]
+        end = self._line_starts[node.end_lineno - 1] + node.end_col_offset
+        return self.source[start:end]
+
+    def digest(self, entity: CodeEntity) -> str:
+        # Everything an analyzer sees of an entity: its kind, whether it is
+        # bound in a class body, and its text from the first decorator on.
+        digest = hashlib.sha256(type(entity).__name__.encode("utf-8"))
+        if isinstance(entity, FunctionEntity):
+            digest.update(b"method" if entity.is_method else b"function")
+        digest.update(b"\0")
+        digest.update(self.segment(entity.ast_node))
+        return digest.hexdigest()
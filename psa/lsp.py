@@ -0,0 +1,262 @@
+import json
+import sys
+import time
+from pathlib import Path
+from threading import Condition, Lock, Thread
+from typing import IO, Any, Callable, Dict, List, Optional
+from urllib.parse import unquote, urlparse
+
+from psa.cache import MemoryCache
+from psa.config.rules import Config, Severity
+from psa.pipeline import Pipeline
+from psa.results import build_diffs
+from psa.rules.engine import RuleEngine
+
+
+SEVERITIES = {Severity.ERROR: 1, Severity.WARNING: 2, Severity.INFO: 3}
+
+# textDocumentSync kind: the client sends the full text on every change.
+FULL_SYNC = 1
+
+
+class Connection:
+    # Base protocol: a Content-Length header block followed by a JSON body.
+    def __init__(self, reader: IO[bytes], writer: IO[bytes]) -> None:
+        self._reader = reader
+        self._writer = writer
+        self._write_lock = Lock()
+
+    def read(self) -> Optional[Dict[str, Any]]:
+        length = None
+        while True:
+            line = self._reader.readline()
+            if not line:
+                return None
+
+            line = line.strip()
+            if not line:
+                break
+
+            name, _, value = line.partition(b":")
+            if name.strip().lower() == b"content-length":
+                length = int(value)
+
+        if length is None:
+            raise ValueError("message without Content-Length")
+        return json.loads(self._reader.read(length))
+
+    def write(self, message: Dict[str, Any]) -> None:
+        body = json.dumps(message).encode("utf-8")
+        with self._write_lock:
+            self._writer.write(b"Content-Length: %d\r\n\r\n" % len(body) + body)
+            self._writer.flush()
+
+    def notify(self, method: str, params: Dict[str, Any]) -> None:
+        self.write({"jsonrpc": "2.0", "method": method, "params": params})
+
+
+class LanguageServer:
+    def __init__(
+        self,
+        config: Config,
+        connection: Connection,
+        root: Optional[Path] = None,
+        debounce: float = 0.15,
+    ) -> None:
+        self.config = config
+        self.connection = connection
+        self.root = root or Path.cwd()
+        self.debounce = debounce
+
+        self.pipeline = Pipeline(config, self.root, cache=MemoryCache())
+
+        # uri -> latest text; uri -> time at which it is due for analysis.
+        self._documents: Dict[str, str] = {}
+        self._due: Dict[str, float] = {}
+        self._cond = Condition()
+        self._running = True
+        self._shutdown = False
+
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            "initialize": self._initialize,
+            "shutdown": self._on_shutdown,
+            "textDocument/didOpen": self._did_open,
+            "textDocument/didChange": self._did_change,
+            "textDocument/didClose": self._did_close,
+        }
+
+    def serve(self) -> int:
+        worker = Thread(target=self._analyze_loop, daemon=True)
+        worker.start()
+
+        try:
+            while True:
+                message = self.connection.read()
+                if message is None or message.get("method") == "exit":
+                    break
+                self._dispatch(message)
+        finally:
+            with self._cond:
+                self._running = False
+                self._cond.notify_all()
+            worker.join()
+
+        return 0 if self._shutdown else 1
+
+    def _dispatch(self, message: Dict[str, Any]) -> None:
+        handler = self._handlers.get(message.get("method"))
+        is_request = "id" in message
+
+        if handler is None:
+            if is_request:
+                self._respond_error(message["id"], -32601, "method not found")
+            return
+
+        try:
+            result = handler(message.get("params") or {})
+        except Exception as e:
+            if is_request:
+                self._respond_error(message["id"], -32603, str(e))
+            return
+
+        if is_request:
+            self.connection.write(
+                {"jsonrpc": "2.0", "id": message["id"], "result": result}
+            )
+
+    def _respond_error(self, request_id: Any, code: int, message: str) -> None:
+        self.connection.write(
+            {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "error": {"code": code, "message": message},
+            }
+        )
+
+    def _initialize(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        root_uri = params.get("rootUri")
+        if root_uri:
+            self.root = _uri_path(root_uri)
+            self.pipeline = Pipeline(self.config, self.root, cache=MemoryCache())
+
+        return {
+            "capabilities": {"textDocumentSync": FULL_SYNC},
+            "serverInfo": {"name": "psa"},
+        }
+
+    def _on_shutdown(self, params: Dict[str, Any]) -> None:
+        self._shutdown = True
+        return None
+
+    def _did_open(self, params: Dict[str, Any]) -> None:
+        document = params["textDocument"]
+        self._schedule(document["uri"], document["text"], delay=0.0)
+
+    def _did_change(self, params: Dict[str, Any]) -> None:
+        changes = params["contentChanges"]
+        if changes:
+            self._schedule(params["textDocument"]["uri"], changes[-1]["text"])
+
+    def _did_close(self, params: Dict[str, Any]) -> None:
+        uri = params["textDocument"]["uri"]
+        with self._cond:
+            self._documents.pop(uri, None)
+            self._due.pop(uri, None)
+        self._publish(uri, [])
+
+    def _schedule(self, uri: str, text: str, delay: Optional[float] = None) -> None:
+        # Every change pushes the deadline back, so a burst of keystrokes
+        # is analyzed once, when typing pauses.
+        with self._cond:
+            self._documents[uri] = text
+            self._due[uri] = time.monotonic() + (
+                self.debounce if delay is None else delay
+            )
+            self._cond.notify_all()
+
+    def _analyze_loop(self) -> None:
+        while True:
+            with self._cond:
+                uri, text = None, None
+                while self._running and uri is None:
+                    now = time.monotonic()
+                    ready = [u for u, due in self._due.items() if due <= now]
+                    if ready:
+                        uri = ready[0]
+                        text = self._documents[uri]
+                        del self._due[uri]
+                    else:
+                        timeout = min(self._due.values(), default=now + 1) - now
+                        self._cond.wait(timeout)
+
+                if not self._running:
+                    return
+
+            self._publish(uri, self.diagnostics(uri, text))
+
+    def diagnostics(self, uri: str, text: str) -> List[Dict[str, Any]]:
+        path = _uri_path(uri)
+        lines = text.splitlines()
+
+        try:
+            results = self.pipeline.process_source(text.encode("utf-8"), path)
+        except SyntaxError as e:
+            line = max((e.lineno or 1) - 1, 0)
+            return [_diagnostic(lines, line, 1, None, e.msg)]
+        except Exception as e:
+            return [_diagnostic(lines, 0, 1, None, str(e))]
+
+        engine = RuleEngine(self.config)
+        violations = engine.check_all(build_diffs(results))
+
+        return [
+            _diagnostic(
+                lines,
+                max(int(v.context.get("line_number") or 1) - 1, 0),
+                SEVERITIES[v.severity],
+                v.rule_id,
+                v.message,
+            )
+            for v in violations
+        ]
+
+    def _publish(self, uri: str, diagnostics: List[Dict[str, Any]]) -> None:
+        with self._cond:
+            # A newer version is already queued, its diagnostics will follow;
+            # or the document was closed while it was being analyzed.
+            if uri in self._due or (diagnostics and uri not in self._documents):
+                return
+        self.connection.notify(
+            "textDocument/publishDiagnostics",
+            {"uri": uri, "diagnostics": diagnostics},
+        )
+
+
+def _diagnostic(
+    lines: List[str], line: int, severity: int, code: Optional[str], message: str
+) -> Dict[str, Any]:
+    width = len(lines[line]) if line < len(lines) else 0
+    diagnostic = {
+        "range": {
+            "start": {"line": line, "character": 0},
+            "end": {"line": line, "character": width},
+        },
+        "severity": severity,
+        "source": "psa",
+        "message": message,
+    }
+    if code:
+        diagnostic["code"] = code
+    return diagnostic
+
+
+def _uri_path(uri: str) -> Path:
+    parsed = urlparse(uri)
+    if parsed.scheme not in ("", "file"):
+        return Path(parsed.path or uri)
+    return Path(unquote(parsed.path))
+
+
+def serve_stdio(config: Config, debounce: float = 0.15) -> int:
+    connection = Connection(sys.stdin.buffer, sys.stdout.buffer)
+    return LanguageServer(config, connection, debounce=debounce).serve()
@@ -1,10 +1,369 @@
+import argparse
+import json
+import os
+import sys
+import time
+from multiprocessing import AuthenticationError
 from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from psa.cache import open_cache
 from psa.config.rules import Config
-from psa.runner import Runner
+from psa.daemon import Daemon, Workspace, default_socket_path, find_socket
+from psa.daemon import query as daemon_query
+from psa.distributed import Coordinator, Worker
+from psa.git import GitError
+from psa.history import History
+from psa.lsp import serve_stdio
+from psa.pipeline import Pipeline
+from psa.results import build_diffs, dump_results, load_results, merge_results
+from psa.rules.engine import RuleEngine
+from psa.runner import EXECUTORS, Runner
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected i/N, got {value!r}")
+
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"shard index must be in 1..{count}")
+
+    return index, count
+
+
+def parse_address(value: str) -> Tuple[str, int]:
+    host, _, port = value.rpartition(":")
+    try:
+        return host or "127.0.0.1", int(port)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected HOST:PORT, got {value!r}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="psa")
+    parser.add_argument("--config", type=Path, default=Path("settings.yaml"))
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="analyze a source tree")
+    run.add_argument("root", type=Path)
+    run.add_argument("-j", "--jobs", type=int, default=1)
+    run.add_argument("--executor", choices=EXECUTORS, default="process")
+    run.add_argument("--entity-jobs", type=int, default=1)
+    run.add_argument("--timings", type=Path)
+    run.add_argument("--cache-dir", type=Path)
+    run.add_argument("--shard", type=parse_shard, metavar="I/N")
+    run.add_argument("--changed-since", metavar="REV")
+    run.add_argument("-o", "--output", type=Path)
+
+    history = commands.add_parser("history", help="metric trends over commits")
+    history.add_argument("root", type=Path)
+    history.add_argument("-n", "--commits", type=int, default=500)
+    history.add_argument("--rev", default="HEAD")
+    history.add_argument("--cache-dir", type=Path)
+    history.add_argument("-o", "--output", type=Path)
+
+    daemon = commands.add_parser("daemon", help="keep results hot for queries")
+    daemon.add_argument("root", type=Path)
+    daemon.add_argument("--socket", type=Path)
+    daemon.add_argument("--interval", type=float, default=0.5)
+    daemon.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=1,
+        help="keep this many preloaded workers for refreshes that change many "
+        "files at once",
+    )
+
+    query = commands.add_parser("query", help="ask a running daemon")
+    query.add_argument("method", choices=("status", "results", "check", "shutdown"))
+    query.add_argument("paths", nargs="*")
+    query.add_argument("--socket", type=Path)
+
+    coordinator = commands.add_parser(
+        "coordinator", help="hand out the files of a tree to remote workers"
+    )
+    coordinator.add_argument("root", type=Path)
+    coordinator.add_argument("--address", type=parse_address, required=True)
+    coordinator.add_argument("--authkey", help="defaults to $PSA_AUTHKEY")
+    coordinator.add_argument("--batch-size", type=int, default=32)
+    coordinator.add_argument("--timeout", type=float)
+    coordinator.add_argument("-o", "--output", type=Path)
+
+    worker = commands.add_parser("worker", help="analyze files for a coordinator")
+    worker.add_argument("root", type=Path)
+    worker.add_argument("--address", type=parse_address, required=True)
+    worker.add_argument("--authkey", help="defaults to $PSA_AUTHKEY")
+    worker.add_argument("--entity-jobs", type=int, default=1)
+    worker.add_argument("--cache-dir", type=Path)
+
+    lsp = commands.add_parser("lsp", help="serve diagnostics to an editor on stdio")
+    lsp.add_argument("--debounce", type=float, default=0.15)
+
+    merge = commands.add_parser("merge", help="combine shard outputs and check")
+    merge.add_argument("shards", type=Path, nargs="+")
+    merge.add_argument("-o", "--output", type=Path)
+
+    return parser
+
+
+def load_config(path: Path) -> Config:
+    return Config.from_yaml(path) if path.exists() else Config()
+
+
+def check(
+    config: Config,
+    results: List[Dict[str, Any]],
+    base: Optional[List[Dict[str, Any]]] = None,
+) -> int:
+    engine = RuleEngine(config)
+    violations = engine.check_all(build_diffs(results, base))
+    errors = [result for result in results if "error" in result]
+
+    for result in errors:
+        print(f"{result['file_path']}: error: {result['error']}")
+
+    for violation in violations:
+        location = (
+            f"{violation.context.get('file_path')}:"
+            f"{violation.context.get('line_number')}"
+        )
+        print(
+            f"{location}: {violation.rule_id} "
+            f"[{violation.severity.value}] {violation.message}"
+        )
+
+    print(
+        f"{len(results) - len(errors)} results, "
+        f"{len(violations)} violations, {len(errors)} errors"
+    )
+
+    return 1 if engine.should_fail() else 0
+
+
+def run(args: argparse.Namespace, config: Config) -> int:
+    if args.shard and args.changed_since:
+        print("psa run: --shard cannot be used with --changed-since", file=sys.stderr)
+        return 2
+
+    try:
+        runner = Runner(
+            config,
+            args.root,
+            [],
+            jobs=args.jobs,
+            executor=args.executor,
+            timings_path=args.timings,
+            entity_jobs=args.entity_jobs,
+            shard=args.shard,
+            cache_dir=args.cache_dir,
+            changed_since=args.changed_since,
+        )
+    except GitError as e:
+        print(f"psa run: {e}", file=sys.stderr)
+        return 2
+
+    results = runner.run()
+
+    if args.output:
+        dump_results(args.output, results, shard=args.shard)
+
+    if args.shard:
+        # Rules are applied once over all shards by `psa merge`.
+        index, count = args.shard
+        print(f"shard {index}/{count}: {len(results)} results")
+        return 0
+
+    try:
+        base = runner.run_base() if args.changed_since else None
+    except GitError as e:
+        print(f"psa run: {e}", file=sys.stderr)
+        return 2
+
+    return check(config, results, base)
+
+
+def merge(args: argparse.Namespace, config: Config) -> int:
+    loaded = [load_results(path) for path in args.shards]
+
+    shards = sorted(shard for shard, _ in loaded if shard)
+    counts = {count for _, count in shards}
+    if len(shards) != len(loaded) or len(counts) != 1:
+        print("psa merge: inputs must be shards of one run", file=sys.stderr)
+        return 2
+
+    (count,) = counts
+    if [index for index, _ in shards] != list(range(1, count + 1)):
+        print(f"psa merge: expected exactly shards 1..{count}", file=sys.stderr)
+        return 2
+
+    results = merge_results([results for _, results in loaded])
+
+    if args.output:
+        dump_results(args.output, results)
+
+    return check(config, results)
+
+
+def history(args: argparse.Namespace, config: Config) -> int:
+    cache = open_cache(config, args.cache_dir)
+
+    scan = History(Pipeline(config, args.root, cache=cache), args.root)
+    rows = []
+    try:
+        for commit, totals in scan.run(args.rev, args.commits):
+            summary = totals.summary()
+            rows.append(
+                {"commit": commit.oid, "timestamp": commit.timestamp, **summary}
+            )
+            print(
+                f"{commit.oid[:10]} "
+                f"{time.strftime('%Y-%m-%d', time.gmtime(commit.timestamp))} "
+                f"files={summary['files']} classes={summary['classes']} "
+                f"lcom={summary['mean_lcom']:.3f} tcc={summary['mean_tcc']:.3f} "
+                f"functions={summary['functions']} writes={summary['writes']} "
+                f"errors={summary['errors']}"
+            )
+    except GitError as e:
+        print(f"psa history: {e}", file=sys.stderr)
+        return 2
+    finally:
+        scan.close()
+
+    print(f"{len(rows)} commits, {scan.distinct_blobs} distinct files analyzed")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+    return 0
+
+
+def daemon(args: argparse.Namespace, config: Config) -> int:
+    socket_path = args.socket or default_socket_path(args.root)
+    workspace = Workspace(config, args.root, jobs=args.jobs)
+    server = Daemon(workspace, socket_path, args.interval)
+
+    print(f"psa daemon: serving {args.root} on {socket_path}", file=sys.stderr)
+    try:
+        server.serve()
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+def query(args: argparse.Namespace, config: Config) -> int:
+    # The daemon resolves relative paths against its own root, so they are
+    # made absolute here, where the working directory is the user's.
+    params = (
+        {"paths": [str(Path(path).resolve()) for path in args.paths]}
+        if args.paths
+        else {}
+    )
+
+    socket_path = args.socket or find_socket(Path.cwd())
+    if socket_path is None:
+        print("psa query: no daemon found for this directory", file=sys.stderr)
+        return 2
+
+    try:
+        result = daemon_query(socket_path, args.method, params)
+    except (OSError, RuntimeError) as e:
+        print(f"psa query: {e}", file=sys.stderr)
+        return 2
+
+    if args.method != "check":
+        print(json.dumps(result, indent=2))
+        return 0
+
+    for error in result["errors"]:
+        print(f"{error['file_path']}: error: {error['error']}")
+    for violation in result["violations"]:
+        print(
+            f"{violation['file_path']}:{violation['line_number']}: "
+            f"{violation['rule_id']} [{violation['severity']}] {violation['message']}"
+        )
+
+    return 1 if result["fail"] else 0
+
+
+def coordinator(args: argparse.Namespace, config: Config) -> int:
+    authkey = _authkey(args)
+    if authkey is None:
+        print("psa coordinator: --authkey or $PSA_AUTHKEY is required", file=sys.stderr)
+        return 2
+
+    files = list(Runner(config, args.root, []).iter_python_files())
+    server = Coordinator(
+        args.root, files, args.address, authkey, batch_size=args.batch_size
+    )
+
+    host, port = server.address
+    print(f"psa coordinator: {len(files)} files on {host}:{port}", file=sys.stderr)
+    try:
+        file_results = server.serve(args.timeout)
+    except TimeoutError as e:
+        print(f"psa coordinator: {e}", file=sys.stderr)
+        return 2
+
+    results = [result for results in file_results for result in results]
+
+    if args.output:
+        dump_results(args.output, results)
+
+    return check(config, results)
+
+
+def worker(args: argparse.Namespace, config: Config) -> int:
+    authkey = _authkey(args)
+    if authkey is None:
+        print("psa worker: --authkey or $PSA_AUTHKEY is required", file=sys.stderr)
+        return 2
+
+    cache = open_cache(config, args.cache_dir)
+
+    try:
+        batches = Worker(
+            config, args.root, args.address, authkey, args.entity_jobs, cache
+        ).serve()
+    except (OSError, EOFError, AuthenticationError) as e:
+        print(f"psa worker: {e}", file=sys.stderr)
+        return 2
+
+    print(f"psa worker: {batches} batches analyzed", file=sys.stderr)
+    return 0
+
+
+def _authkey(args: argparse.Namespace) -> Optional[bytes]:
+    # Taken from the environment by default, as command lines are visible
+    # to every user of the machine.
+    authkey = args.authkey or os.environ.get("PSA_AUTHKEY")
+    return authkey.encode("utf-8") if authkey else None
+
+
+def lsp(args: argparse.Namespace, config: Config) -> int:
+    return serve_stdio(config, debounce=args.debounce)
+
 
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    config = load_config(args.config)
 
-config = Config.from_yaml("settings.yaml")
+    commands = {
+        "run": run,
+        "merge": merge,
+        "history": history,
+        "daemon": daemon,
+        "query": query,
+        "coordinator": coordinator,
+        "worker": worker,
+        "lsp": lsp,
+    }
+    return commands[args.command](args, config)
 
-runner = Runner(config, Path("./psa/config"), [])
 
-a = runner.run()
\ No newline at end of file
+if __name__ == "__main__":
+    sys.exit(main())
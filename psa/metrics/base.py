@@ -1,27 +1,45 @@
 from abc import ABC, abstractmethod
-from typing import Any, Iterator, Type
+from threading import Lock
+from typing import Any, ClassVar, FrozenSet, Iterator, Optional, Tuple, Type
 
 from psa.entity import CodeEntity
-from psa.index.maps import Index
+from psa.index.maps import Feature, Index
 
 
 class Analyzer(ABC):
-    _ANALYZER_REGISTRY: set[Type["Analyzer"]] = set()
+    _ANALYZER_REGISTRY: dict[Type["Analyzer"], None] = {}
+    _REGISTRY_LOCK = Lock()
+
+    # Optional parts of the index that analyze() reads.
+    requires: ClassVar[FrozenSet[Feature]] = frozenset()
+    # Bytes at least one of which occurs in every file analyze() can report
+    # on, e.g. a keyword its entities are defined with; other files are not
+    # parsed. None if there are no such bytes.
+    source_markers: ClassVar[Optional[FrozenSet[bytes]]] = None
+    # Name of the Config section with the analyzer's `enabled` and `ignore`
+    # settings, None if it is always run.
+    config_section: ClassVar[Optional[str]] = None
 
     def __init_subclass__(cls, **kwargs) -> None:
         """Register analyzer to registry."""
         super().__init_subclass__(**kwargs)
         if not cls.__name__.startswith("_"):
-            cls._ANALYZER_REGISTRY.add(cls)
+            with cls._REGISTRY_LOCK:
+                cls._ANALYZER_REGISTRY[cls] = None
 
     @abstractmethod
     def applies_to(self, entity: Any) -> bool: ...
     @abstractmethod
     def analyze(self, index: Index, entity: Any) -> Any: ...
 
+    @classmethod
+    def registered(cls) -> Tuple[Type["Analyzer"], ...]:
+        with cls._REGISTRY_LOCK:
+            return tuple(cls._ANALYZER_REGISTRY)
+
     @classmethod
     def for_entity(cls, entity: CodeEntity) -> Iterator["Analyzer"]:
-        for analyzer in cls._ANALYZER_REGISTRY:
+        for analyzer in cls.registered():
             analyzer = analyzer()
             if analyzer.applies_to(entity):
                 yield analyzer
@@ -1,8 +1,7 @@
 from typing import Dict, NamedTuple, Set, FrozenSet
 
-from entity import ClassEntity, FunctionEntity
+from psa.entity import ClassEntity, FunctionEntity
 from psa.index.maps import Index
-from psa.nodes import PropertyVisitor, SelfAttrVisitor, DynamicAttrVisitor
 
 
 class ClassMetrics(NamedTuple):
@@ -55,9 +54,7 @@ def analyze_class(index: Index, cls: ClassEntity) -> ClassMetrics:
     attrs_read: Set[str] = set()
     attrs_written: Set[str] = set()
 
-    property_visitor = PropertyVisitor()
-    property_visitor.visit(cls.ast_node)
-    property_to_attr = property_visitor.property_to_attr
+    property_to_attr = dict(index.facts_map.get(cls.node_id).properties)
 
     for child_id in child_ids if child_ids else []:
         ent = index.node_map.get(child_id)
@@ -80,24 +77,28 @@ def analyze_class(index: Index, cls: ClassEntity) -> ClassMetrics:
             if "property" in ent.decorators:
                 property_methods.add(method_name)
 
-            self_visitor = SelfAttrVisitor(property_to_attr=property_to_attr)
-            self_visitor.visit(ent.ast_node)
-
-            dynamic_visitor = DynamicAttrVisitor()
-            dynamic_visitor.visit(ent.ast_node)
-
-            all_attrs_used = self_visitor.attrs_used | dynamic_visitor.attrs_used
-            for attr in all_attrs_used:
-                method_attr_usage[method_name].add(attr)
-
-            instance_attrs.update(self_visitor.instance_attrs)
-            instance_attrs.update(dynamic_visitor.attrs_used)
-
-            attrs_read.update(self_visitor.attrs_read)
-            attrs_read.update(dynamic_visitor.attrs_read)
-
-            attrs_written.update(self_visitor.attrs_written)
-            attrs_written.update(dynamic_visitor.attrs_written)
+            facts = index.facts_map.get(ent.node_id)
+            usage = method_attr_usage[method_name]
+
+            for attr, access in facts.self_attrs:
+                attr = property_to_attr.get(attr, attr)
+                usage.add(attr)
+                if access == "write":
+                    attrs_written.add(attr)
+                    instance_attrs.add(attr)
+                elif access == "read":
+                    attrs_read.add(attr)
+
+            for attr, access in facts.dict_attrs | facts.dynamic_attrs:
+                usage.add(attr)
+                if access == "write":
+                    attrs_written.add(attr)
+                else:
+                    attrs_read.add(attr)
+
+            # Attributes set or read by name are taken to be instance
+            # attributes, unlike those reached through the instance dict.
+            instance_attrs.update(attr for attr, _ in facts.dynamic_attrs)
 
     frozen_method_attr_usage = {
         method: frozenset(attrs) for method, attrs in method_attr_usage.items()
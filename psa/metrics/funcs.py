@@ -7,7 +7,6 @@ from psa.entity import (
     NonlocalDeclEntity,
 )
 from psa.index.maps import Index
-from psa.nodes import AssignVisitor, ExprEffectsVisitor
 
 
 ArgName: TypeAlias = str
@@ -68,31 +67,42 @@ def analyze_func(index: Index, func: FunctionEntity) -> FuncMetrics:
         elif isinstance(ent, NonlocalDeclEntity):
             nonlocal_names.update(ent.names)
 
-    assign_visitor = AssignVisitor(
-        args=arg_names_set,
-        globals=global_names,
-        nonlocals=nonlocal_names,
-    )
-    assign_visitor.visit(func.ast_node)
-
-    expr_visitor = ExprEffectsVisitor(
-        args=arg_names_set,
-        globals=global_names,
-        nonlocals=nonlocal_names,
-    )
-    expr_visitor.visit(func.ast_node)
-
-    attr_mutates = assign_visitor.attr_mutates | expr_visitor.attr_mutates
+    facts = index.facts_map.get(func.node_id)
+    # Attributes of arguments and of declared globals and nonlocals belong
+    # to objects that outlive the call, so touching them is a mutation.
+    outer_names = arg_names_set | global_names | nonlocal_names
+
+    attrs_read: Set[str] = set()
+    attrs_written: Set[str] = set()
+    attr_mutates: Set[Tuple[str, str]] = set()
+
+    for obj, attr in facts.attrs_written:
+        if obj in outer_names:
+            attr_mutates.add((obj, attr))
+        else:
+            attrs_written.add(f"{obj}.{attr}")
+
+    for obj, attr in facts.attrs_loaded:
+        if obj in outer_names:
+            attr_mutates.add((obj, attr))
+        else:
+            attrs_read.add(f"{obj}.{attr}")
+
+    local_vars = {
+        name
+        for name in facts.names_written
+        if name not in global_names and name not in nonlocal_names
+    }
 
     metrics = FuncMetrics(
         args=frozenset(arg_names_set),
         globals_written=frozenset(global_names),
         nonlocals_written=frozenset(nonlocal_names),
-        attrs_read=frozenset(expr_visitor.attrs_read),
-        attrs_written=frozenset(assign_visitor.attrs_written),
+        attrs_read=frozenset(attrs_read),
+        attrs_written=frozenset(attrs_written),
         attr_mutates=frozenset(attr_mutates),
         arg_mutates=frozenset(arg_mutates),
-        local_vars=frozenset(assign_visitor.locals_written),
+        local_vars=frozenset(local_vars),
         calls=frozenset(calls),
     )
 
@@ -1,7 +1,7 @@
 from collections import deque
 from typing import Dict, NamedTuple, Set
 
-from psa.index.maps import Index
+from psa.index.maps import Feature, Index
 from psa.metrics.base import Analyzer
 
 from psa.metrics.classes import ClassMetrics, analyze_class, get_methods
@@ -105,6 +105,10 @@ def calculate_lcom(metrics: ClassMetrics) -> LCOM:
 
 
 class LCOMAnalyzer(Analyzer):
+    requires = frozenset({Feature.CLASS_FACTS})
+    source_markers = frozenset({b"class"})
+    config_section = "lcom"
+
     def applies_to(self, entity: CodeEntity) -> bool:
         return isinstance(entity, ClassEntity)
 
@@ -1,7 +1,7 @@
 from typing import NamedTuple
 
 from psa.entity import CodeEntity, FunctionEntity
-from psa.index.maps import Index
+from psa.index.maps import Feature, Index
 from psa.metrics.base import Analyzer
 from psa.metrics.funcs import analyze_func
 
@@ -14,6 +14,10 @@ class SideEffect(NamedTuple):
 
 
 class SideEffectAnalyzer(Analyzer):
+    requires = frozenset({Feature.CALLS, Feature.FUNC_FACTS})
+    source_markers = frozenset({b"def"})
+    config_section = "sife_effects"
+
     def applies_to(self, entity: CodeEntity) -> bool:
         return isinstance(entity, FunctionEntity)
 
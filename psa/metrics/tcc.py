@@ -1,6 +1,6 @@
 from typing import NamedTuple
 
-from psa.index.maps import Index
+from psa.index.maps import Feature, Index
 from psa.metrics.classes import ClassMetrics, analyze_class, get_methods
 from psa.metrics.base import Analyzer
 from psa.entity import ClassEntity, CodeEntity
@@ -74,6 +74,10 @@ def _calculate_tcc(metrics: ClassMetrics) -> TCC:
 
 
 class TCCAnalyzer(Analyzer):
+    requires = frozenset({Feature.CLASS_FACTS})
+    source_markers = frozenset({b"class"})
+    config_section = "tcc"
+
     def applies_to(self, entity: CodeEntity) -> bool:
         return isinstance(entity, ClassEntity)
 
@@ -1,21 +1,135 @@
 import ast
-from dataclasses import dataclass
-from typing import Any, Final, List, Optional, Set, Tuple
-from psa.index.maps import Index
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    Dict,
+    Final,
+    FrozenSet,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeAlias,
+)
+from psa.index.maps import ClassFacts, Feature, FuncFacts, Index
 from psa.index.scopes import ClassScope, FuncScope, ModuleScope, Scope
 from psa.entity import CallEntity, CodeEntity, ModuleEntity
+from psa.traversal import HandlerTables, Visitor
 from psa.utils import wrap_ast_node
 
 
-class ASTVisitor(ast.NodeVisitor):
-    def __init__(self, index: Index) -> None:
+@dataclass
+class ExprInfo:
+    reads: set[str]
+    calls: List[Tuple]
+    attrs: List[str]
+    const: List[Any]
+
+
+# Number of reads, calls, attributes and constants seen so far.
+Mark: TypeAlias = Tuple[int, int, int, int]
+
+
+@dataclass
+class ExprEvents:
+    # What the expressions under the calls of a file read, call and refer
+    # to, in visiting order. The events between two marks of a call are the
+    # summary of one of its arguments, so each expression is looked at once
+    # however deeply calls nest.
+    reads: List[str] = field(default_factory=list)
+    calls: List[Tuple] = field(default_factory=list)
+    attrs: List[str] = field(default_factory=list)
+    consts: List[Any] = field(default_factory=list)
+
+    def mark(self) -> Mark:
+        return len(self.reads), len(self.calls), len(self.attrs), len(self.consts)
+
+    def summary(self, start: Mark, end: Mark) -> ExprInfo:
+        return ExprInfo(
+            reads=set(self.reads[start[0] : end[0]]),
+            calls=self.calls[start[1] : end[1]],
+            attrs=self.attrs[start[2] : end[2]],
+            const=self.consts[start[3] : end[3]],
+        )
+
+
+class CallSummaries:
+    # The argument summaries of one call, cut out of the file's events the
+    # first time they are asked for.
+    __slots__ = ("_events", "_marks", "_keywords", "_resolved")
+
+    def __init__(
+        self, events: ExprEvents, marks: List[Mark], keywords: List[Optional[str]]
+    ) -> None:
+        self._events = events
+        # One mark before every argument and keyword, and one after the last.
+        self._marks = marks
+        self._keywords = keywords
+        self._resolved: Optional[Tuple[List[ExprInfo], Dict[str, ExprInfo]]] = None
+
+    def resolve(self) -> Tuple[List[ExprInfo], Dict[str, ExprInfo]]:
+        if self._resolved is None:
+            marks = self._marks
+            summaries = [
+                self._events.summary(start, end) for start, end in zip(marks, marks[1:])
+            ]
+            positional = len(summaries) - len(self._keywords)
+
+            self._resolved = (
+                summaries[:positional],
+                {
+                    name: info
+                    for name, info in zip(self._keywords, summaries[positional:])
+                    if name
+                },
+            )
+        return self._resolved
+
+
+ACCESS: Final[Dict[Type[ast.expr_context], str]] = {
+    ast.Load: "read",
+    ast.Store: "write",
+    ast.Del: "del",
+}
+
+ATTR_FUNCS: Final = {"setattr": "write", "delattr": "write", "getattr": "read"}
+
+
+class ASTVisitor(Visitor):
+    # Builds the index in a single pass over the module: entities, scopes and
+    # calls, together with the facts the class and function metrics are
+    # computed from, so that no analyzer has to walk the tree again. Calls
+    # and facts are only recorded for the features asked for.
+    def __init__(
+        self, index: Index, features: FrozenSet[Feature] = frozenset(Feature)
+    ) -> None:
         self.index = index
 
+        # Argument summaries are kept on call entities, so they need calls.
+        self._calls = Feature.CALLS in features or Feature.CALL_ARGS in features
+        self._func_facts = Feature.FUNC_FACTS in features
+        self._class_facts = Feature.CLASS_FACTS in features
+        self._facts = self._func_facts or self._class_facts
+
         self.scope_stack: List[Scope] = []
         self.parent_stack: List[int] = []
 
+        # Facts of the innermost enclosing function and class. A nested
+        # definition's facts are folded into its parent's when it ends, as
+        # the metrics of a definition cover everything below it.
+        self.func_facts: List[FuncFacts] = []
+        self.class_facts: List[ClassFacts] = []
+
+        # Parameters of lambdas inside annotations are not entities.
+        self._annotation_depth = 0
+
+        # Events for the argument summaries of calls, and the marks of the
+        # calls being visited; no events are kept without summaries.
+        self._events = ExprEvents() if Feature.CALL_ARGS in features else None
+        self._open_calls: List[List[Mark]] = []
+
     def build_module(self, node: ast.Module, name: str) -> ModuleScope:
-        module_id = self.index.next_node_id()
+        module_id = self.index.node_id(node)
 
         module_entity = ModuleEntity(
             name=name, line=0, node_id=module_id, ast_node=node
@@ -37,7 +151,7 @@ class ASTVisitor(ast.NodeVisitor):
         return module_scope
 
     def _register_entity(self, node: ast.AST) -> Optional[CodeEntity]:
-        entity = wrap_ast_node(node, self.scope_stack[-1])
+        entity = wrap_ast_node(node, self.index.node_id, self.scope_stack[-1])
         if not entity:
             return None
 
@@ -48,13 +162,13 @@ class ASTVisitor(ast.NodeVisitor):
 
         return entity
 
-    def visit_Module(self, node: ast.Module) -> None:
-        self.generic_visit(node)
-
     def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
         entity = self._register_entity(node)
-        if not entity:
-            return
+
+        if self.class_facts:
+            attr = _property_attr(node)
+            if attr is not None:
+                self.class_facts[-1].properties.append((node.name, attr))
 
         func_scope = FuncScope(
             node_id=entity.node_id,
@@ -68,15 +182,22 @@ class ASTVisitor(ast.NodeVisitor):
         self.scope_stack.append(func_scope)
         self.parent_stack.append(entity.node_id)
 
-        self.generic_visit(node)
+        if self._facts:
+            facts = FuncFacts()
+            self.index.facts_map.add(entity.node_id, facts)
+            self.func_facts.append(facts)
 
+    def leave_FunctionDef(self, node: ast.FunctionDef) -> None:
         self.parent_stack.pop()
         self.scope_stack.pop()
 
+        if self._facts:
+            facts = self.func_facts.pop()
+            if self.func_facts:
+                self.func_facts[-1].merge(facts)
+
     def visit_ClassDef(self, node: ast.ClassDef) -> None:
         entity = self._register_entity(node)
-        if not entity:
-            return
 
         class_scope = ClassScope(
             node_id=entity.node_id,
@@ -90,26 +211,36 @@ class ASTVisitor(ast.NodeVisitor):
         self.scope_stack.append(class_scope)
         self.parent_stack.append(entity.node_id)
 
-        self.generic_visit(node)
+        if self._class_facts:
+            facts = ClassFacts()
+            self.index.facts_map.add(entity.node_id, facts)
+            self.class_facts.append(facts)
 
+    def leave_ClassDef(self, node: ast.ClassDef) -> None:
         self.parent_stack.pop()
         self.scope_stack.pop()
 
+        if self._class_facts:
+            facts = self.class_facts.pop()
+            if self.class_facts:
+                self.class_facts[-1].merge(facts)
+
     def visit_Assign(self, node: ast.Assign) -> None:
         self._register_entity(node)
-        self.generic_visit(node)
+        if self.func_facts and self._func_facts:
+            for target in node.targets:
+                _collect_target(target, self.func_facts[-1])
 
     def visit_AnnAssign(self, node: ast.AnnAssign):
         self._register_entity(node)
-        self.generic_visit(node)
+        if self.func_facts and self._func_facts:
+            _collect_target(node.target, self.func_facts[-1])
 
     def visit_Import(self, node: ast.Import):
         self._register_entity(node)
-        self.generic_visit(node)
 
     def visit_ImportFrom(self, node: ast.ImportFrom):
         self._register_entity(node)
-        self.generic_visit(node)
 
     def visit_Global(self, node: ast.Global):
         self._register_entity(node)
@@ -118,290 +249,55 @@ class ASTVisitor(ast.NodeVisitor):
         self._register_entity(node)
 
     def visit_arg(self, node: ast.arg):
-        self._register_entity(node)
-
+        if not self._annotation_depth:
+            self._register_entity(node)
 
-@dataclass
-class ExprInfo:
-    reads: set[str]
-    calls: List[Tuple]
-    attrs: List[str]
-    const: List[Any]
+        self._annotation_depth += 1
 
-
-class ExprVisitor(ast.NodeVisitor):
-    def __init__(self) -> None:
-        self.reads: Set[str] = set()
-        self.calls: List[Tuple] = []
-        self.attrs: List[str] = []
-        self.const: List = []
-
-    def visit_Call(self, node: ast.Call) -> None:
-        name = None
-        receiver = None
-
-        if isinstance(node.func, ast.Name):
-            name = node.func.id
-        elif isinstance(node.func, ast.Attribute):
-            if isinstance(node.func.value, ast.Name):
-                receiver = node.func.value.id
-                name = node.func.attr
-
-        if name:
-            self.calls.append((name, receiver))
-
-        self.generic_visit(node)
-
-    def visit_Name(self, node: ast.Name) -> None:
-        if isinstance(node.ctx, ast.Load):
-            self.reads.add(node.id)
-
-    def visit_Constant(self, node: ast.Constant) -> None:
-        self.const.append(node.value)
-
-    def visit_Attribute(self, node: ast.Attribute) -> None:
-        if isinstance(node.value, ast.Name):
-            self.attrs.append(f"{node.value.id}.{node.attr}")
-        self.generic_visit(node)
-
-    @classmethod
-    def analyze(cls, node: ast.AST) -> ExprInfo:
-        v = cls()
-        v.visit(node)
-
-        return ExprInfo(
-            reads=v.reads,
-            calls=v.calls,
-            attrs=v.attrs,
-            const=v.const,
-        )
-
-
-class ExprEffectsVisitor(ast.NodeVisitor):
-    def __init__(
-        self, *, args: Set[str], globals: Set[str], nonlocals: Set[str]
-    ) -> None:
-        self.args = args
-        self.globals = globals
-        self.nonlocals = nonlocals
-
-        self.attrs_read: Set[str] = set()
-        self.attrs_written: Set[str] = set()
-        self.attr_mutates: Set[tuple[str, str]] = set()
+    def leave_arg(self, node: ast.arg):
+        self._annotation_depth -= 1
 
     def visit_Attribute(self, node: ast.Attribute) -> None:
-        if isinstance(node.value, ast.Name):
+        if self.func_facts and isinstance(node.value, ast.Name):
+            facts = self.func_facts[-1]
             obj = node.value.id
-            attr = node.attr
-            if isinstance(node.ctx, ast.Load):
-                if obj in self.args | self.globals | self.nonlocals:
-                    self.attr_mutates.add((obj, attr))
-                else:
-                    self.attrs_read.add(f"{obj}.{attr}")
-        self.generic_visit(node)
 
+            if self._func_facts and isinstance(node.ctx, ast.Load):
+                facts.attrs_loaded.add((obj, node.attr))
+            if self._class_facts and obj == "self":
+                facts.self_attrs.add((node.attr, ACCESS[type(node.ctx)]))
 
-class AssignVisitor(ast.NodeVisitor):
-    def __init__(
-        self, *, args: Set[str], globals: Set[str], nonlocals: Set[str]
-    ) -> None:
-        self.args = args
-        self.globals = globals
-        self.nonlocals = nonlocals
+        if self._open_calls and isinstance(node.value, ast.Name):
+            self._events.attrs.append(f"{node.value.id}.{node.attr}")
 
-        self.attrs_written: Set[str] = set()
-        self.attr_mutates: Set[tuple[str, str]] = set()
-        self.locals_written: Set[str] = set()
+    def visit_Name(self, node: ast.Name) -> None:
+        if self._open_calls and isinstance(node.ctx, ast.Load):
+            self._events.reads.append(node.id)
 
-    def visit_Assign(self, node: ast.Assign) -> None:
-        for target in node.targets:
-            self._handle_target(target)
-        self.generic_visit(node.value)
-
-    def visit_AnnAssign(self, node: ast.AnnAssign) -> None:
-        self._handle_target(node.target)
-        if node.value:
-            self.generic_visit(node.value)
-
-    def _handle_target(self, target: ast.AST):
-        match target:
-            case ast.Name(id=name):
-                self._handle_name(name)
-            case ast.Attribute(value=ast.Name(id=obj), attr=attr):
-                self._handle_attr(obj, attr)
-            case ast.Subscript(value=ast.Name(id=obj)):
-                self._handle_subscript(obj)
-            case ast.Tuple(elts=elts) | ast.List(elts=elts):
-                for elt in elts:
-                    self._handle_target(elt)
-
-            case _:
-                pass
-
-    def _handle_name(self, name: str) -> None:
-        if name not in self.globals and name not in self.nonlocals:
-            self.locals_written.add(name)
-
-    def _handle_attr(self, obj: str, attr: str) -> None:
-        if obj in self.args | self.globals | self.nonlocals:
-            self.attr_mutates.add((obj, attr))
-        else:
-            self.attrs_written.add(f"{obj}.{attr}")
-
-    def _handle_subscript(self, obj: str):
-        if obj in self.args | self.globals | self.nonlocals:
-            self.attr_mutates.add((obj, "__setitem__"))
-        else:
-            self.attrs_written.add(f"{obj}.__setitem__")
-
-
-class SelfAttrVisitor(ast.NodeVisitor):
-    def __init__(self, property_to_attr: dict[str, str]) -> None:
-        self.property_to_attr = property_to_attr
-        self.attrs_used: Set[str] = set()
-        self.attrs_read: Set[str] = set()
-        self.attrs_written: Set[str] = set()
-        self.instance_attrs: Set[str] = set()
+    def visit_Constant(self, node: ast.Constant) -> None:
+        if self._open_calls:
+            self._events.consts.append(node.value)
 
     def visit_Subscript(self, node: ast.Subscript) -> None:
-        if not isinstance(node.slice, ast.Constant):
-            self.generic_visit(node)
-            return
-
-        attr_name = str(node.slice.value)
-
-        if isinstance(node.ctx, ast.Store):
-            state = "write"
-        elif isinstance(node.ctx, ast.Load):
-            state = "read"
-        else:
-            self.generic_visit(node)
-            return
-
-        if isinstance(node.value, ast.Attribute):
-            if (
-                isinstance(node.value.value, ast.Name)
-                and node.value.value.id == "self"
-                and node.value.attr == "__dict__"
-            ):
-                self.attrs_used.add(attr_name)
-                if state == "write":
-                    self.attrs_written.add(attr_name)
-                elif state == "read":
-                    self.attrs_read.add(attr_name)
-
-        elif isinstance(node.value, ast.Call):
-            if (
-                isinstance(node.value.func, ast.Name)
-                and node.value.func.id == "vars"
-                and len(node.value.args) >= 1
-                and isinstance(node.value.args[0], ast.Name)
-                and node.value.args[0].id == "self"
-            ):
-                self.attrs_used.add(attr_name)
-                if state == "write":
-                    self.attrs_written.add(attr_name)
-                elif state == "read":
-                    self.attrs_read.add(attr_name)
-
-        self.generic_visit(node)
-
-    def visit_Attribute(self, node: ast.Attribute) -> None:
-        if isinstance(node.value, ast.Name) and node.value.id == "self":
-            attr = node.attr
-
-            resolved = self.property_to_attr.get(attr, attr)
-
-            self.attrs_used.add(resolved)
-
-            if isinstance(node.ctx, ast.Store):
-                self.attrs_written.add(resolved)
-                self.instance_attrs.add(resolved)
-
-            elif isinstance(node.ctx, ast.Load):
-                self.attrs_read.add(resolved)
-
-        self.generic_visit(node)
-
-
-class DynamicAttrVisitor(ast.NodeVisitor):
-    ATTR_FUNCS: Final = {"setattr": "write", "delattr": "write", "getattr": "read"}
-
-    def __init__(self) -> None:
-        self.attrs_read: Set[str] = set()
-        self.attrs_written: Set[str] = set()
-        self.attrs_used: Set[str] = set()
-
-    def visit_Call(self, node: ast.Call) -> None:
-        if isinstance(node.func, ast.Name) and node.func.id in self.ATTR_FUNCS:
-            if (
-                len(node.args) >= 2
-                and isinstance(node.args[0], ast.Name)
-                and node.args[0].id == "self"
-            ):
-                if isinstance(node.args[1], ast.Constant):
-                    attr_name = str(node.args[1].value)
-                    action = self.ATTR_FUNCS[node.func.id]
-
-                    self.attrs_used.add(attr_name)
-
-                    if action == "write":
-                        self.attrs_written.add(attr_name)
-                    else:
-                        self.attrs_read.add(attr_name)
-
-        elif isinstance(node.func, ast.Attribute):
-            if isinstance(node.func.value, ast.Call):
-                call = node.func.value
-                if (
-                    isinstance(call.func, ast.Name)
-                    and call.func.id == "vars"
-                    and len(call.args) >= 1
-                    and isinstance(call.args[0], ast.Name)
-                    and call.args[0].id == "self"
-                    and node.func.attr == "get"
-                    and len(node.args) >= 1
-                    and isinstance(node.args[0], ast.Constant)
-                ):
-                    attr_name = str(node.args[0].value)
-                    self.attrs_used.add(attr_name)
-                    self.attrs_read.add(attr_name)
-
-        self.generic_visit(node)
-
-
-class PropertyVisitor(ast.NodeVisitor):
-    def __init__(self) -> None:
-        self.property_to_attr: dict[str, str] = {}
-
-    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
-        is_property = any(
-            (isinstance(dec, ast.Name) and dec.id == "property")
-            for dec in node.decorator_list
-        )
-
-        if not is_property:
-            self.generic_visit(node)
-            return
-
-        for stmt in node.body:
-            if isinstance(stmt, ast.Return) and isinstance(stmt.value, ast.Attribute):
-                if (
-                    isinstance(stmt.value.value, ast.Name)
-                    and stmt.value.value.id == "self"
-                ):
-                    self.property_to_attr[node.name] = stmt.value.attr
-                    break
-
-        self.generic_visit(node)
-
-
-class CallVisitor(ast.NodeVisitor):
-    def __init__(self, index: Index, scope: Scope) -> None:
-        self.index = index
-        self.scope = scope
+        if (
+            self.func_facts
+            and isinstance(node.slice, ast.Constant)
+            and not isinstance(node.ctx, ast.Del)
+            and _is_self_dict(node.value)
+        ):
+            self.func_facts[-1].dict_attrs.add(
+                (str(node.slice.value), ACCESS[type(node.ctx)])
+            )
+
+    def visit_Call(self, node: ast.Call) -> Optional[List[Any]]:
+        if self.func_facts and self._class_facts:
+            dynamic_attr = _dynamic_attr(node)
+            if dynamic_attr is not None:
+                self.func_facts[-1].dynamic_attrs.add(dynamic_attr)
+
+        if not self._calls:
+            return None
 
-    def visit_Call(self, node: ast.Call) -> None:
         func_name = ""
         receiver = None
         is_method_call = False
@@ -415,23 +311,136 @@ class CallVisitor(ast.NodeVisitor):
                 func_name = node.func.attr
                 is_method_call = True
 
-        args = [ExprVisitor.analyze(arg) for arg in node.args]
-
-        kws = {kw.arg: ExprVisitor.analyze(kw.value) for kw in node.keywords if kw.arg}
+        # Calls belong to the module scope, wherever they appear.
+        module_scope = self.scope_stack[0]
 
         call_entity = CallEntity(
-            node_id=self.index.next_node_id(),
+            node_id=self.index.node_id(node),
             name=func_name,
             line=node.lineno,
             ast_node=node,
-            args=args,
-            keywords=kws,
             is_method_call=is_method_call,
             receiver=receiver,
-            scope=self.scope,
+            scope=module_scope,
         )
 
         self.index.call_map.add(call_entity)
-        self.index.children_map.link(self.scope.node_id, call_entity.node_id)
+        self.index.children_map.link(module_scope.node_id, call_entity.node_id)
+
+        if self._events is None:
+            return None
+
+        if self._open_calls and func_name:
+            self._events.calls.append((func_name, receiver))
+
+        # Mark where each argument starts; leave_Call marks where the last
+        # one ends.
+        marks: List[Mark] = []
+        self._open_calls.append(marks)
+        call_entity.summaries = CallSummaries(
+            self._events, marks, [kw.arg for kw in node.keywords]
+        )
 
-        self.generic_visit(node)
+        items: List[Any] = [node.func]
+        for arg in (*node.args, *node.keywords):
+            items.append((self._mark, marks))
+            items.append(arg)
+        return items
+
+    def leave_Call(self, node: ast.Call) -> None:
+        self._mark(self._open_calls.pop())
+
+    def _mark(self, marks: List[Mark]) -> None:
+        marks.append(self._events.mark())
+
+    def handlers(self) -> HandlerTables:
+        enter, leave = super().handlers()
+        if not self._class_facts:
+            # Only self.__dict__[...] and vars(self)[...] are of interest.
+            del enter[ast.Subscript]
+        if not (self._calls or self._class_facts):
+            del enter[ast.Call]
+        if not self._facts and self._events is None:
+            del enter[ast.Attribute]
+        if self._events is None:
+            # Names and constants only matter to argument summaries.
+            del enter[ast.Name], enter[ast.Constant]
+            del leave[ast.Call]
+        return enter, leave
+
+
+def _collect_target(target: ast.AST, facts: FuncFacts) -> None:
+    match target:
+        case ast.Name(id=name):
+            facts.names_written.add(name)
+        case ast.Attribute(value=ast.Name(id=obj), attr=attr):
+            facts.attrs_written.add((obj, attr))
+        case ast.Subscript(value=ast.Name(id=obj)):
+            facts.attrs_written.add((obj, "__setitem__"))
+        case ast.Tuple(elts=elts) | ast.List(elts=elts):
+            for elt in elts:
+                _collect_target(elt, facts)
+
+        case _:
+            pass
+
+
+def _is_self(node: ast.AST) -> bool:
+    return isinstance(node, ast.Name) and node.id == "self"
+
+
+def _is_vars_self(node: ast.AST) -> bool:
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id == "vars"
+        and len(node.args) >= 1
+        and _is_self(node.args[0])
+    )
+
+
+def _is_self_dict(node: ast.AST) -> bool:
+    # self.__dict__ or vars(self)
+    if isinstance(node, ast.Attribute):
+        return _is_self(node.value) and node.attr == "__dict__"
+    return _is_vars_self(node)
+
+
+def _dynamic_attr(node: ast.Call) -> Optional[Tuple[str, str]]:
+    func = node.func
+
+    if isinstance(func, ast.Name) and func.id in ATTR_FUNCS:
+        if (
+            len(node.args) >= 2
+            and _is_self(node.args[0])
+            and isinstance(node.args[1], ast.Constant)
+        ):
+            return str(node.args[1].value), ATTR_FUNCS[func.id]
+
+    elif isinstance(func, ast.Attribute):
+        if (
+            _is_vars_self(func.value)
+            and func.attr == "get"
+            and len(node.args) >= 1
+            and isinstance(node.args[0], ast.Constant)
+        ):
+            return str(node.args[0].value), "read"
+
+    return None
+
+
+def _property_attr(node: ast.FunctionDef) -> Optional[str]:
+    # The attribute a `@property` returns as `return self.<attribute>`.
+    is_property = any(
+        (isinstance(dec, ast.Name) and dec.id == "property")
+        for dec in node.decorator_list
+    )
+    if not is_property:
+        return None
+
+    for stmt in node.body:
+        if isinstance(stmt, ast.Return) and isinstance(stmt.value, ast.Attribute):
+            if _is_self(stmt.value.value):
+                return stmt.value.attr
+
+    return None
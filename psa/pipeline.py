@@ -1,40 +1,243 @@
+import ast
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, List
+from threading import Lock
+from typing import Any, Dict, Final, List, Optional, Sequence, Tuple
+from psa.cache import Cache
 from psa.config.rules import Config
 from psa.index.extractor import Extractor
 from psa.index.maps import Index
+from psa.index.segments import SegmentHasher
 from psa.entity import CodeEntity
 from psa.index.collector import EntityCollector
 from psa.metrics.base import Analyzer
-from psa.nodes import ASTVisitor, CallVisitor
+from psa.nodes import ASTVisitor
+from psa.plan import ExecutionPlan, FilePlan
 
 
 class Pipeline:
-    def __init__(self, config: Config, root_path: Path) -> None:
+    ENTITY_PARALLEL_THRESHOLD: Final = 64
+    ENTITY_CHUNKS_PER_JOB: Final = 4
+
+    def __init__(
+        self,
+        config: Config,
+        root_path: Path,
+        entity_jobs: int = 1,
+        cache: Optional[Cache] = None,
+    ) -> None:
         self.config = config
 
         self._extractor = Extractor(root_path)
+        self.plan = ExecutionPlan(
+            config, root_path, [analyzer() for analyzer in Analyzer.registered()]
+        )
+        self._cache = cache
+
+        self._entity_jobs = entity_jobs
+        self._entity_executor: Optional[ThreadPoolExecutor] = None
+        self._entity_executor_lock = Lock()
+
+    @property
+    def extractor(self) -> Extractor:
+        return self._extractor
 
     def process_file(self, file_path: Path) -> List[Dict[str, Any]]:
-        tree, module_name = self._extractor.extract_file(file_path)
-        index = self._build_index(tree, module_name)
+        return self.process_file_cached(file_path)[0]
+
+    def process_file_cached(self, file_path: Path) -> Tuple[List[Dict[str, Any]], bool]:
+        # The results of the file, and whether they came from the cache.
+        if self.plan.excludes(file_path):
+            return [], False
+
+        source = self._extractor.read_source(file_path)
+        return self._process_source_cached(source, file_path)
+
+    def process_source(self, source: bytes, file_path: Path) -> List[Dict[str, Any]]:
+        return self._process_source_cached(source, file_path)[0]
+
+    def _process_source_cached(
+        self, source: bytes, file_path: Path
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        if not self.may_report(source, file_path):
+            self.check_syntax(source, file_path)
+            return [], False
+
+        key = self.cache_key(source, file_path)
+        results = self.load_cached(key, file_path)
+        if results is not None:
+            return results, True
+
+        results = self._process_source(source, file_path)
+        self.store_cached(key, results)
+        return results, False
+
+    def may_report(self, source: bytes, file_path: Optional[Path] = None) -> bool:
+        # False for sources no analyzer can report on, which need not be
+        # parsed or indexed; they are only passed to check_syntax().
+        file_plan = self.plan.for_path(file_path)
+        if not file_plan.analyzers:
+            return False
+        return file_plan.source_filter.may_match(source)
+
+    def check_syntax(self, source: bytes, file_path: Path) -> None:
+        # Raises the SyntaxError parse_source would, without building the
+        # index. This costs as much as a parse, so skipped files only
+        # report syntax errors when the config asks for it.
+        if self.config.check_syntax:
+            compile(source, str(file_path), "exec", ast.PyCF_ONLY_AST)
+
+    def cache_key(
+        self, source: bytes, file_path: Optional[Path] = None
+    ) -> Optional[str]:
+        if self._cache is None:
+            return None
+        return self._cache.key(source, self.plan.for_path(file_path).fingerprint)
+
+    def load_cached(
+        self, key: Optional[str], file_path: Path
+    ) -> Optional[List[Dict[str, Any]]]:
+        if key is None:
+            return None
+
+        results = self._cache.get(key)
+        if results is None:
+            return None
 
-        entities = self._build_entities(index)
-        results = self._run_analyzers(index, entities)
+        module_name = self._extractor.module_name(file_path)
         for result in results:
             result["file_path"] = str(file_path)
             result["module"] = module_name
 
         return results
 
-    def _build_index(self, tree, module_name: str) -> Index:
-        index = Index()
+    def store_cached(self, key: Optional[str], results: List[Dict[str, Any]]) -> None:
+        if key is not None:
+            self._cache.put(key, results)
+
+    def _process_source(self, source: bytes, file_path: Path) -> List[Dict[str, Any]]:
+        tree, module_name = self._extractor.parse_source(source, file_path)
+        index, entities = self.index_tree(tree, module_name, file_path)
+
+        return self.analyze(index, entities, file_path, module_name, source)
+
+    def index_tree(
+        self, tree, module_name: str, file_path: Optional[Path] = None
+    ) -> Tuple[Index, List[CodeEntity]]:
+        index = self._build_index(tree, module_name, self.plan.for_path(file_path))
+        return index, self._build_entities(index)
+
+    def analyze(
+        self,
+        index: Index,
+        entities: List[CodeEntity],
+        file_path: Path,
+        module_name: str,
+        source: Optional[bytes] = None,
+    ) -> List[Dict[str, Any]]:
+        file_plan = self.plan.for_path(file_path)
+        if source is not None and self._cache is not None:
+            results = self._analyze_changed(
+                index, entities, file_path, source, file_plan
+            )
+        else:
+            results = self._run_analyzers(index, entities, file_plan.analyzers)
+
+        for result in results:
+            result["file_path"] = str(file_path)
+            result["module"] = module_name
 
-        ast_builder = ASTVisitor(index)
-        module_scope = ast_builder.build_module(tree, module_name)
+        return results
 
-        call_builder = CallVisitor(index, module_scope)
-        call_builder.visit(tree)
+    def _analyze_changed(
+        self,
+        index: Index,
+        entities: List[CodeEntity],
+        file_path: Path,
+        source: bytes,
+        file_plan: FilePlan,
+    ) -> List[Dict[str, Any]]:
+        # Results of the previous version of this file are kept per source
+        # segment, and only entities whose segment changed are analyzed.
+        analyzers = file_plan.analyzers
+        table_key = self._entity_table_key(file_path, file_plan)
+        previous = self._load_entity_table(table_key)
+
+        hasher = SegmentHasher(source)
+        entities = [
+            entity
+            for entity in entities
+            if any(analyzer.applies_to(entity) for analyzer in analyzers)
+        ]
+        digests = {entity.node_id: hasher.digest(entity) for entity in entities}
+
+        by_entity: Dict[int, List[Dict[str, Any]]] = {}
+        changed = []
+        for entity in entities:
+            records = previous.get(digests[entity.node_id])
+            if records is None:
+                changed.append(entity)
+            else:
+                by_entity[entity.node_id] = [
+                    self._rebase_record(record, index, entity) for record in records
+                ]
+
+        for result in self._run_analyzers(index, changed, analyzers):
+            by_entity.setdefault(result["node_id"], []).append(result)
+
+        results = []
+        table = []
+        for entity in entities:
+            for result in by_entity.get(entity.node_id, []):
+                results.append(result)
+                table.append({**result, "segment": digests[entity.node_id]})
+
+        self.store_cached(table_key, table)
+        return results
+
+    def _entity_table_key(self, file_path: Path, file_plan: FilePlan) -> str:
+        root = self._extractor.root_path
+        try:
+            name = file_path.relative_to(root).as_posix() if root else str(file_path)
+        except ValueError:
+            name = str(file_path)
+        return self._cache.key(
+            name.encode("utf-8"), f"{file_plan.fingerprint}:entities"
+        )
+
+    def _load_entity_table(self, key: str) -> Dict[str, List[Dict[str, Any]]]:
+        # Identical segments produce identical records, so only those of
+        # the first entity with a given segment are kept.
+        table: Dict[str, List[Dict[str, Any]]] = {}
+        owners: Dict[str, int] = {}
+        for record in self._cache.get(key) or []:
+            digest = record.pop("segment")
+            if owners.setdefault(digest, record["node_id"]) == record["node_id"]:
+                table.setdefault(digest, []).append(record)
+        return table
+
+    @staticmethod
+    def _rebase_record(
+        record: Dict[str, Any], index: Index, entity: CodeEntity
+    ) -> Dict[str, Any]:
+        # The segment may have moved within the file or under another
+        # parent with the same kind, so positional fields are refreshed.
+        context = record["context"]
+        if isinstance(context, dict) and "line_number" in context:
+            context = {**context, "line_number": entity.line}
+
+        return {
+            **record,
+            "node_id": entity.node_id,
+            "qualname": index.qualname(entity),
+            "context": context,
+        }
+
+    def _build_index(self, tree, module_name: str, file_plan: FilePlan) -> Index:
+        index = Index()
+
+        ASTVisitor(index, file_plan.features).build_module(tree, module_name)
 
         return index
 
@@ -42,17 +245,69 @@ class Pipeline:
         return EntityCollector(index).collect()
 
     def _run_analyzers(
-        self, index: Index, entities: List[CodeEntity]
+        self,
+        index: Index,
+        entities: List[CodeEntity],
+        analyzers: Sequence[Analyzer],
+    ) -> List[Dict[str, Any]]:
+        if self._entity_jobs > 1:
+            entities = [
+                entity
+                for entity in entities
+                if any(analyzer.applies_to(entity) for analyzer in analyzers)
+            ]
+            if len(entities) >= self.ENTITY_PARALLEL_THRESHOLD:
+                return self._run_analyzers_parallel(index, entities, analyzers)
+
+        return self._analyze_entities(index, analyzers, entities)
+
+    def _run_analyzers_parallel(
+        self,
+        index: Index,
+        entities: List[CodeEntity],
+        analyzers: Sequence[Analyzer],
+    ) -> List[Dict[str, Any]]:
+        # The index is only read by analyzers, so contiguous slices of the
+        # entity list can share it; concatenating the slice results in
+        # submission order gives the same output as a serial pass.
+        chunk_count = self._entity_jobs * self.ENTITY_CHUNKS_PER_JOB
+        size = max(1, -(-len(entities) // chunk_count))
+        chunks = [entities[i : i + size] for i in range(0, len(entities), size)]
+
+        results = []
+        analyze = partial(self._analyze_entities, index, analyzers)
+        for chunk_results in self._get_entity_executor().map(analyze, chunks):
+            results.extend(chunk_results)
+
+        return results
+
+    def _get_entity_executor(self) -> ThreadPoolExecutor:
+        with self._entity_executor_lock:
+            if self._entity_executor is None:
+                self._entity_executor = ThreadPoolExecutor(
+                    max_workers=self._entity_jobs, thread_name_prefix="psa-entity"
+                )
+            return self._entity_executor
+
+    def _analyze_entities(
+        self,
+        index: Index,
+        analyzers: Sequence[Analyzer],
+        entities: List[CodeEntity],
     ) -> List[Dict[str, Any]]:
         results = []
         for entity in entities:
-            for analyzer in Analyzer.for_entity(entity):
+            for analyzer in analyzers:
+                if not analyzer.applies_to(entity):
+                    continue
+
                 value, context = analyzer.analyze(index, entity)
 
                 results.append(
                     {
                         "analyzer": analyzer.__class__.__name__,
                         "entity": entity.name,
+                        "qualname": index.qualname(entity),
                         "entity_type": entity.__class__.__name__,
                         "node_id": entity.node_id,
                         "value": value,
@@ -61,4 +316,3 @@ class Pipeline:
                 )
 
         return results
-
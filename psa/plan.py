@@ -0,0 +1,149 @@
+import hashlib
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from pathlib import Path
+from typing import Dict, Final, FrozenSet, List, Optional, Sequence, Tuple
+
+import psa
+from psa.config.rules import Config
+from psa.index.maps import Feature
+from psa.index.prefilter import SourceFilter
+from psa.metrics.base import Analyzer
+
+
+# Bumped whenever the fields of result records change, so that cached
+# results in the old layout are not reused.
+RECORD_VERSION: Final = 4
+
+
+@dataclass(frozen=True, eq=False)
+class FilePlan:
+    # What to do with one file: the analyzers to run on it, the parts of
+    # the index they read, and the fingerprint its cached results are
+    # stored under. A plan without analyzers means the file is not read.
+    analyzers: Tuple[Analyzer, ...]
+    features: FrozenSet[Feature]
+    source_filter: SourceFilter
+    # Everything besides the source text that decides what the pipeline
+    # returns for the file.
+    fingerprint: str
+
+
+class ExecutionPlan:
+    # Compiled from the configuration once per pipeline. Disabled analyzers
+    # are left out altogether; the `ignore` globs of the others decide, per
+    # file, which of them run.
+    #
+    # Globs are matched segment by segment against the path relative to
+    # the root. One ending in "/" names a directory, and matches files at
+    # any depth below it ("tests/", "pkg/generated/"); any other names a
+    # file ("test_*.py", "pkg/settings.py"). A leading "/" anchors a glob
+    # at the root.
+    def __init__(
+        self,
+        config: Config,
+        root_path: Optional[Path],
+        analyzers: Sequence[Analyzer],
+    ) -> None:
+        self.root_path = root_path
+
+        self._rules: List[Tuple[Analyzer, Tuple[str, ...]]] = []
+        for analyzer in analyzers:
+            section = (
+                getattr(config, analyzer.config_section)
+                if analyzer.config_section
+                else None
+            )
+            if section is None:
+                self._rules.append((analyzer, ()))
+            elif section.enabled:
+                self._rules.append((analyzer, tuple(section.ignore)))
+
+        self._ignores = any(ignore for _, ignore in self._rules)
+        self._plans: Dict[Tuple[int, ...], FilePlan] = {}
+        self.default = self._plan(tuple(range(len(self._rules))))
+
+    @property
+    def analyzers(self) -> Tuple[Analyzer, ...]:
+        return self.default.analyzers
+
+    def for_path(self, path: Optional[Path]) -> FilePlan:
+        if path is None or not self._ignores:
+            return self.default
+
+        parts = self._relative_parts(path)
+        active = tuple(
+            i
+            for i, (_, ignore) in enumerate(self._rules)
+            if not any(_matches(parts, pattern) for pattern in ignore)
+        )
+        return self._plan(active)
+
+    def excludes(self, path: Path) -> bool:
+        return not self.for_path(path).analyzers
+
+    def _relative_parts(self, path: Path) -> Tuple[str, ...]:
+        root = self.root_path
+        if root is not None:
+            try:
+                return path.relative_to(root).parts
+            except ValueError:
+                pass
+            try:
+                return path.absolute().relative_to(root.absolute()).parts
+            except ValueError:
+                pass
+        return path.parts
+
+    def _plan(self, active: Tuple[int, ...]) -> FilePlan:
+        # Files share a plan when the same analyzers apply to them.
+        plan = self._plans.get(active)
+        if plan is None:
+            analyzers = tuple(self._rules[i][0] for i in active)
+            plan = self._plans.setdefault(
+                active,
+                FilePlan(
+                    analyzers=analyzers,
+                    features=frozenset().union(
+                        *(analyzer.requires for analyzer in analyzers)
+                    ),
+                    source_filter=SourceFilter.for_analyzers(analyzers),
+                    fingerprint=_fingerprint(analyzers),
+                ),
+            )
+        return plan
+
+
+def _fingerprint(analyzers: Sequence[Analyzer]) -> str:
+    parts = [psa.__version__, f"records={RECORD_VERSION}"]
+    parts.extend(
+        f"{type(analyzer).__module__}.{type(analyzer).__qualname__}"
+        for analyzer in analyzers
+    )
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def _matches(parts: Tuple[str, ...], pattern: str) -> bool:
+    anchored = pattern.startswith("/")
+    directory = pattern.endswith("/")
+    segments = [segment for segment in pattern.split("/") if segment]
+    if not segments:
+        return False
+
+    # A directory glob may match any run of directories, a file glob only
+    # the run that ends with the file name.
+    candidates = parts[:-1] if directory else parts
+    last = len(candidates) - len(segments)
+    if last < 0:
+        return False
+    starts = range(last + 1) if directory else range(last, last + 1)
+    if anchored:
+        starts = range(0, 1) if starts[0] == 0 else range(0)
+
+    return any(
+        all(
+            fnmatchcase(part, segment)
+            for part, segment in zip(candidates[start:], segments)
+        )
+        for start in starts
+    )
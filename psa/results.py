@@ -0,0 +1,179 @@
+import json
+from pathlib import Path
+from typing import Any, Callable, Dict, Final, Iterator, List, Optional, Tuple
+
+from psa.diff.lcom import diff_lcom
+from psa.diff.side_effect import diff_side_effect
+from psa.diff.tcc import TCCDiff
+from psa.metrics.lcom import LCOM
+from psa.metrics.side_effect import SideEffect
+from psa.metrics.tcc import TCC
+
+
+FORMAT_VERSION: Final = 1
+
+VALUE_TYPES: Final = {
+    value_type.__name__: value_type for value_type in (LCOM, SideEffect, TCC)
+}
+
+DIFFERS: Final[Dict[str, Tuple[str, Callable[[Any, Any], Any]]]] = {
+    "LCOMAnalyzer": ("lcom", diff_lcom),
+    "SideEffectAnalyzer": ("side_effect", diff_side_effect),
+    "TCCAnalyzer": ("tcc", TCCDiff.from_metrics),
+}
+
+DiffResult = Tuple[str, object, dict]
+
+
+def encode_value(value: Any) -> Any:
+    if isinstance(value, tuple) and type(value).__name__ in VALUE_TYPES:
+        fields = {name: encode_value(v) for name, v in value._asdict().items()}
+        return {"$type": type(value).__name__, "fields": fields}
+    if isinstance(value, (set, frozenset)):
+        items = [encode_value(v) for v in value]
+        items.sort(key=lambda v: json.dumps(v, sort_keys=True))
+        return {"$set": items}
+    if isinstance(value, tuple):
+        return {"$tuple": [encode_value(v) for v in value]}
+    if isinstance(value, list):
+        return [encode_value(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): encode_value(v) for k, v in value.items()}
+    return value
+
+
+def decode_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return [decode_value(v) for v in value]
+    if not isinstance(value, dict):
+        return value
+
+    if "$type" in value:
+        fields = {k: decode_value(v) for k, v in value["fields"].items()}
+        return VALUE_TYPES[value["$type"]](**fields)
+    if "$set" in value:
+        return frozenset(decode_value(v) for v in value["$set"])
+    if "$tuple" in value:
+        return tuple(decode_value(v) for v in value["$tuple"])
+    return {k: decode_value(v) for k, v in value.items()}
+
+
+def dump_results(
+    path: Path,
+    results: List[Dict[str, Any]],
+    shard: Optional[Tuple[int, int]] = None,
+) -> None:
+    data = {
+        "version": FORMAT_VERSION,
+        "shard": list(shard) if shard else None,
+        "results": [encode_value(dict(result)) for result in results],
+    }
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def load_results(
+    path: Path,
+) -> Tuple[Optional[Tuple[int, int]], List[Dict[str, Any]]]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    if data.get("version") != FORMAT_VERSION:
+        raise ValueError(
+            f"{path}: unsupported results format version {data.get('version')!r}"
+        )
+
+    shard = tuple(data["shard"]) if data.get("shard") else None
+    return shard, [decode_value(result) for result in data["results"]]
+
+
+def merge_results(shards: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    # Every shard is already in file order and owns disjoint files, so a
+    # stable sort on the path restores the order of an unsharded run. Paths
+    # are compared as paths, like the runner sorts them, so that "a/x.py"
+    # comes before "a-b/x.py".
+    merged = [result for results in shards for result in results]
+    merged.sort(key=lambda result: Path(result["file_path"]))
+    return merged
+
+
+def build_diffs(
+    results: List[Dict[str, Any]],
+    base: Optional[List[Dict[str, Any]]] = None,
+) -> List[DiffResult]:
+    # Without base results there is no previous revision to compare with,
+    # so every entity is compared with itself and only the absolute
+    # thresholds can fire.
+    base_values = _index_values(base) if base is not None else {}
+
+    diffs: List[DiffResult] = []
+    for key, result in _keyed(results):
+        diff_type, differ = DIFFERS[result["analyzer"]]
+        new = result["value"]
+
+        if base is None:
+            old = new
+        elif key in base_values:
+            old = base_values[key]
+        else:
+            old = _missing_value(new)
+
+        diffs.append((diff_type, differ(old, new), _diff_context(result)))
+
+    return diffs
+
+
+def _keyed(
+    results: List[Dict[str, Any]],
+) -> Iterator[Tuple[Tuple[Any, ...], Dict[str, Any]]]:
+    # Entities are matched across revisions by qualified name; repeated
+    # definitions of one name are told apart by their order in the file.
+    seen: Dict[Tuple[Any, ...], int] = {}
+
+    for result in results:
+        if "error" in result or result.get("analyzer") not in DIFFERS:
+            continue
+
+        key = (
+            result.get("file_path"),
+            result["analyzer"],
+            result.get("entity_type"),
+            result.get("qualname", result.get("entity")),
+        )
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+
+        yield (*key, occurrence), result
+
+
+def _index_values(results: List[Dict[str, Any]]) -> Dict[Tuple[Any, ...], Any]:
+    return {key: result["value"] for key, result in _keyed(results)}
+
+
+def _missing_value(new: Any) -> Any:
+    # Baseline for an entity that is new in this revision: all of its side
+    # effects are additions, while cohesion has nothing to regress from.
+    if isinstance(new, SideEffect):
+        return SideEffect(frozenset(), frozenset(), frozenset(), frozenset())
+    if isinstance(new, TCC):
+        return None
+    return new
+
+
+def _diff_context(result: Dict[str, Any]) -> Dict[str, Any]:
+    context = dict(result.get("context", {}))
+    context.update(
+        file_path=result.get("file_path"),
+        module=result.get("module"),
+        entity=result.get("entity"),
+        qualname=result.get("qualname"),
+    )
+
+    value = result["value"]
+    if isinstance(value, LCOM):
+        context["new_lcom_value"] = value.lcom_value
+    elif isinstance(value, TCC):
+        context["new_tcc_value"] = value.tcc_value
+
+    return context
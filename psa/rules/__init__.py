@@ -1,6 +1,6 @@
-from rules import lcom
-from rules import side_effect
-from rules import tcc
+from psa.rules import lcom
+from psa.rules import side_effect
+from psa.rules import tcc
 
 
 __all__ = ["side_effect", "lcom", "tcc"]
@@ -4,7 +4,7 @@ from typing import Any, Type
 
 from psa.config.rules import Config, Severity
 
-_RULE_REGISTRY: set[Type["Rule"]] = set()
+_RULE_REGISTRY: dict[Type["Rule"], None] = {}
 
 
 @dataclass
@@ -23,7 +23,7 @@ class Rule(ABC):
         """Register rule to registry."""
         super().__init_subclass__(**kwargs)
         if not cls.__name__.startswith("_"):
-            _RULE_REGISTRY.add(cls)
+            _RULE_REGISTRY[cls] = None
 
     @abstractmethod
     def applies_to(self, diff: Any) -> bool: ...
@@ -20,6 +20,18 @@ class RuleEngine:
 
         return self.violations
 
+    def check_all(
+        self, diffs: list[tuple[str, Any, dict[str, Any]]]
+    ) -> list[Violation]:
+        self.violations.clear()
+
+        for _, diff, context in diffs:
+            for rule in self.rules:
+                if rule.applies_to(diff):
+                    self.violations.extend(rule.check(diff, context))
+
+        return self.violations
+
     def _has_errors(self) -> bool:
         return any(v.severity == Severity.ERROR for v in self.violations)
 
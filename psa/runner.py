@@ -1,40 +1,321 @@
+import atexit
+import hashlib
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Tuple
+from threading import Lock
+from typing import Any, Dict, Final, Iterable, Iterator, List, Optional, Tuple
 
+from psa.cache import ResultCache, open_cache
+from psa.index.extractor import GitBlobExtractor
 from psa.config.rules import Config
+from psa.git import changed_files, resolve_revision
 from psa.reporters.base import BaseReporter
 from psa.pipeline import Pipeline
+from psa.scheduler import CostModel
+from psa.staged import StageLimits, StagedPipeline
 
 
 DiffResult = Tuple[str, object, dict]
+FileResults = List[Dict[str, Any]]
+FileOutcome = Tuple[FileResults, Optional[float]]
+
+EXECUTORS: Final = ("process", "thread", "staged")
+
+PRELOAD_MODULES: Final = [
+    "yaml",
+    "psa.config.rules",
+    "psa.metrics",
+    "psa.pipeline",
+    "psa.rules",
+]
+
+
+_worker_pipeline: Optional[Pipeline] = None
+
+
+def _init_worker(
+    config: Config, root: Path, entity_jobs: int, cache: Optional[ResultCache]
+) -> None:
+    global _worker_pipeline
+    _worker_pipeline = Pipeline(config, root, entity_jobs, cache)
+
+
+def _process_in_worker(file_path: Path) -> FileOutcome:
+    return _process_file(_worker_pipeline, file_path)
+
+
+def _process_file(pipeline: Pipeline, file_path: Path) -> FileOutcome:
+    started = time.perf_counter()
+    cached = False
+    try:
+        results, cached = pipeline.process_file_cached(file_path)
+    except Exception as e:
+        results = [
+            {
+                "file_path": str(file_path),
+                "error": str(e),
+            }
+        ]
+
+    # A cache hit says nothing about what analyzing the file costs, and
+    # recording it would make the file look cheap to the next cold run.
+    return results, None if cached else time.perf_counter() - started
+
+
+def _warm_up_worker(_: int) -> int:
+    return os.getpid()
+
+
+class WorkerPool:
+    def __init__(
+        self,
+        config: Config,
+        root: Path,
+        workers: int,
+        entity_jobs: int = 1,
+        cache: Optional[ResultCache] = None,
+    ) -> None:
+        self.workers = workers
+        self.closed = False
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=_warm_pool_context(),
+            initializer=_init_worker,
+            initargs=(config, root, entity_jobs, cache),
+        )
+
+    def warm_up(self) -> None:
+        list(self._executor.map(_warm_up_worker, range(self.workers)))
+
+    def map_files(self, files: List[Path]) -> Iterator[FileOutcome]:
+        try:
+            yield from self._executor.map(_process_in_worker, files)
+        except BrokenProcessPool:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        self.closed = True
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _warm_pool_context():
+    # A fork server that has already imported the analyzers hands out
+    # workers that skip the import cost of psa, yaml and the rule registry.
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        return None
+
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(PRELOAD_MODULES)
+    return context
+
+
+# Pools are reused by later runs in the same process (the daemon, a test
+# session, an embedding tool) and shut down when it exits; they are never
+# shared between separate `psa` invocations.
+_warm_pools: Dict[Tuple[str, str, int, int, Optional[str]], WorkerPool] = {}
+_warm_pools_lock = Lock()
+
+
+def get_warm_pool(
+    config: Config,
+    root: Path,
+    workers: int,
+    entity_jobs: int = 1,
+    cache: Optional[ResultCache] = None,
+) -> WorkerPool:
+    cache_dir = str(cache.directory) if cache else None
+    key = (repr(config), str(root.resolve()), workers, entity_jobs, cache_dir)
+
+    with _warm_pools_lock:
+        pool = _warm_pools.get(key)
+        if pool is None or pool.closed:
+            pool = WorkerPool(config, root, workers, entity_jobs, cache)
+            pool.warm_up()
+            _warm_pools[key] = pool
+
+    return pool
+
+
+@atexit.register
+def shutdown_warm_pools() -> None:
+    with _warm_pools_lock:
+        for pool in _warm_pools.values():
+            pool.close()
+        _warm_pools.clear()
 
 
 class Runner:
     def __init__(
-        self, config: Config, root: Path, reporters: List[BaseReporter]
+        self,
+        config: Config,
+        root: Path,
+        reporters: List[BaseReporter],
+        jobs: int = 1,
+        executor: str = "process",
+        timings_path: Optional[Path] = None,
+        entity_jobs: int = 1,
+        shard: Optional[Tuple[int, int]] = None,
+        warm_pool: bool = False,
+        cache_dir: Optional[Path] = None,
+        changed_since: Optional[str] = None,
     ) -> None:
+        if executor not in EXECUTORS:
+            raise ValueError(
+                f"Unknown executor {executor!r}, expected one of {EXECUTORS}"
+            )
+        if shard is not None and not 1 <= shard[0] <= shard[1]:
+            raise ValueError(f"Invalid shard {shard[0]}/{shard[1]}")
+
         self.config = config
         self.reporters = reporters
         self.root = root
-        self.pipeline = Pipeline(config, root)
+        self.jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+        self.executor = executor
+        self.shard = shard
+        self.warm_pool = warm_pool
+        self.timings_path = timings_path
+        self.cost_model = (
+            CostModel.load(root, timings_path) if timings_path else CostModel(root)
+        )
+        self.entity_jobs = entity_jobs
+
+        self.cache = open_cache(config, cache_dir)
+
+        self.pipeline = Pipeline(config, root, entity_jobs, self.cache)
+
+        # Maps every changed file to its path at the base revision, or None
+        # for files that did not exist there.
+        self.base_revision: Optional[str] = None
+        self.changes: Optional[Dict[Path, Optional[str]]] = None
+        if changed_since is not None:
+            self.base_revision = resolve_revision(root, changed_since)
+            self.changes = {
+                root / change.path: change.base_path
+                for change in changed_files(root, self.base_revision)
+                if change.path.endswith(".py")
+            }
 
     def iter_python_files(self) -> Iterable[Path]:
-        for path in self.root.rglob("*.py"):
-            yield path
+        if self.changes is not None:
+            paths = sorted(path for path in self.changes if path.is_file())
+        else:
+            paths = sorted(self.root.rglob("*.py"))
+
+        for path in paths:
+            if self.pipeline.plan.excludes(path):
+                continue
+            if self.shard is None or self._in_shard(path):
+                yield path
+
+    def _in_shard(self, path: Path) -> bool:
+        # Hash the root-relative path so that every CI job computes the same
+        # partition regardless of where the checkout lives.
+        index, count = self.shard
+        relative = path.relative_to(self.root).as_posix()
+        digest = hashlib.sha1(relative.encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") % count == index - 1
 
     def run(self) -> List[Dict[str, Any]]:
+        files = list(self.iter_python_files())
+
+        if self.jobs > 1 and len(files) > 1:
+            outcomes = self._run_parallel(files)
+        else:
+            outcomes = [_process_file(self.pipeline, path) for path in files]
+
         results = []
+        for path, (file_results, seconds) in zip(files, outcomes):
+            results.extend(file_results)
+            if seconds is not None:
+                self.cost_model.record(path, seconds)
 
-        for file_path in self.iter_python_files():
-            try:
-                file_results = self.pipeline.process_file(file_path)
-                results.extend(file_results)
-            except Exception as e:
-                results.append(
-                    {
-                        "file_path": str(file_path),
-                        "error": str(e),
-                    }
-                )
+        if self.timings_path:
+            self.cost_model.save(self.timings_path)
 
         return results
+
+    def run_base(self) -> List[Dict[str, Any]]:
+        # Metrics of the changed files as of the base revision, recorded
+        # under their current paths so that they pair up with run().
+        if self.changes is None:
+            raise ValueError("run_base() requires changed_since")
+
+        extractor = GitBlobExtractor(self.root, self.base_revision)
+        results = []
+        try:
+            for path in self.iter_python_files():
+                base_path = self.changes[path]
+                if base_path is None:
+                    continue
+
+                source = extractor.read_source(self.root / base_path)
+                try:
+                    results.extend(self.pipeline.process_source(source, path))
+                except (SyntaxError, ValueError, UnicodeDecodeError):
+                    # Without a parseable base version every entity counts as
+                    # new. Failing to read it is a GitError for the caller.
+                    continue
+        finally:
+            extractor.close()
+
+        return results
+
+    def _run_parallel(self, files: List[Path]) -> List[FileOutcome]:
+        # Most expensive files go first so that they do not end up as
+        # stragglers; outcomes are put back in discovery order afterwards.
+        schedule = self.cost_model.order(files)
+        dispatched = [files[i] for i in schedule]
+
+        outcomes: List[FileOutcome] = [([], None)] * len(files)
+        for i, outcome in zip(schedule, self._dispatch(dispatched)):
+            outcomes[i] = outcome
+
+        return outcomes
+
+    def _dispatch(self, files: List[Path]) -> Iterable[FileOutcome]:
+        workers = min(self.jobs, len(files))
+
+        if self.executor == "thread":
+            # Threads share this runner's pipeline: the parsed config and the
+            # analyzer instances are never copied, and each file gets its own
+            # Index, so node ids do not depend on scheduling.
+            process = partial(_process_file, self.pipeline)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                yield from executor.map(process, files)
+            return
+
+        if self.executor == "staged":
+            staged = StagedPipeline(self.pipeline, StageLimits.for_jobs(workers))
+            for file_results in staged.run(files):
+                yield file_results, None
+            return
+
+        # One file per task: batching would hand the largest files, which
+        # are scheduled next to each other, to the same worker.
+        if self.warm_pool:
+            pool = get_warm_pool(
+                self.config, self.root, self.jobs, self.entity_jobs, self.cache
+            )
+            outcomes = pool.map_files(files)
+        else:
+            executor = self._process_executor(workers)
+            outcomes = executor.map(_process_in_worker, files)
+
+        try:
+            yield from outcomes
+        finally:
+            if not self.warm_pool:
+                executor.shutdown()
+
+    def _process_executor(self, workers: int) -> Executor:
+        return ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(self.config, self.root, self.entity_jobs, self.cache),
+        )
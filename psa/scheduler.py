@@ -0,0 +1,83 @@
+import json
+import os
+from pathlib import Path
+from typing import Dict, Final, List, Optional, Sequence, Tuple
+
+
+class CostModel:
+    DEFAULT_SECONDS_PER_BYTE: Final = 2e-6
+
+    def __init__(
+        self, root: Path, timings: Optional[Dict[str, Tuple[float, int]]] = None
+    ) -> None:
+        self.root = root
+        self.timings: Dict[str, Tuple[float, int]] = dict(timings or {})
+        # Average over every recorded timing, kept until the next record().
+        self._rate: Optional[float] = None
+
+    @classmethod
+    def load(cls, root: Path, path: Path) -> "CostModel":
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls(root)
+
+        timings = {
+            key: (float(seconds), int(size))
+            for key, (seconds, size) in data.get("timings", {}).items()
+        }
+        return cls(root, timings)
+
+    def save(self, path: Path) -> None:
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"timings": self.timings}, f, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def record(self, file_path: Path, seconds: float) -> None:
+        self.timings[self._key(file_path)] = (seconds, self._size(file_path))
+        self._rate = None
+
+    def estimate(self, file_path: Path) -> float:
+        size = self._size(file_path)
+
+        recorded = self.timings.get(self._key(file_path))
+        if recorded is not None:
+            seconds, recorded_size = recorded
+            if recorded_size > 0:
+                return seconds * size / recorded_size
+            return seconds
+
+        return size * self._seconds_per_byte()
+
+    def order(self, files: Sequence[Path]) -> List[int]:
+        costs = [self.estimate(path) for path in files]
+        return sorted(range(len(files)), key=lambda i: costs[i], reverse=True)
+
+    def _seconds_per_byte(self) -> float:
+        if self._rate is None:
+            self._rate = self._average_rate()
+        return self._rate
+
+    def _average_rate(self) -> float:
+        total_seconds = sum(seconds for seconds, _ in self.timings.values())
+        total_size = sum(size for _, size in self.timings.values())
+
+        if total_seconds <= 0 or total_size <= 0:
+            return self.DEFAULT_SECONDS_PER_BYTE
+
+        return total_seconds / total_size
+
+    def _key(self, file_path: Path) -> str:
+        try:
+            return file_path.relative_to(self.root).as_posix()
+        except ValueError:
+            return file_path.as_posix()
+
+    @staticmethod
+    def _size(file_path: Path) -> int:
+        try:
+            return file_path.stat().st_size
+        except OSError:
+            return 0
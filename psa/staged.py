@@ -0,0 +1,161 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from psa.pipeline import Pipeline
+
+
+FileResults = List[Dict[str, Any]]
+
+_DONE = object()
+
+
+@dataclass(frozen=True)
+class StageLimits:
+    read: int = 16
+    parse: int = 2
+    index: int = 2
+    analyze: int = 2
+    queue_size: int = 64
+
+    @classmethod
+    def for_jobs(cls, jobs: int) -> "StageLimits":
+        return cls(read=4 * jobs, parse=jobs, index=jobs, analyze=jobs)
+
+
+@dataclass(slots=True)
+class _Job:
+    position: int
+    path: Path
+    payload: Any = None
+    source: Optional[bytes] = None
+    results: Optional[FileResults] = None
+    cache_key: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class _Stage:
+    name: str
+    step: Callable[[_Job], None]
+    limit: int
+
+
+class StagedPipeline:
+    def __init__(
+        self, pipeline: Pipeline, limits: Optional[StageLimits] = None
+    ) -> None:
+        self.pipeline = pipeline
+        self.limits = limits or StageLimits()
+
+    def run(self, files: List[Path]) -> List[FileResults]:
+        return asyncio.run(self.run_async(files))
+
+    async def run_async(self, files: List[Path]) -> List[FileResults]:
+        stages = [
+            _Stage("read", self._read, self.limits.read),
+            _Stage("parse", self._parse, self.limits.parse),
+            _Stage("index", self._index, self.limits.index),
+            _Stage("analyze", self._analyze, self.limits.analyze),
+        ]
+        queues = [
+            asyncio.Queue(maxsize=self.limits.queue_size)
+            for _ in range(len(stages) + 1)
+        ]
+        slots: List[FileResults] = [[] for _ in files]
+
+        tasks = [asyncio.create_task(self._feed(files, queues[0]))]
+        for stage, inbox, outbox in zip(stages, queues, queues[1:]):
+            tasks.append(asyncio.create_task(self._run_stage(stage, inbox, outbox)))
+        tasks.append(asyncio.create_task(self._report(queues[-1], slots)))
+
+        await asyncio.gather(*tasks)
+
+        return slots
+
+    async def _feed(self, files: List[Path], outbox: asyncio.Queue) -> None:
+        for position, path in enumerate(files):
+            await outbox.put(_Job(position, path))
+        await outbox.put(_DONE)
+
+    async def _run_stage(
+        self, stage: _Stage, inbox: asyncio.Queue, outbox: asyncio.Queue
+    ) -> None:
+        limit = max(1, stage.limit)
+        with ThreadPoolExecutor(
+            max_workers=limit, thread_name_prefix=f"psa-{stage.name}"
+        ) as executor:
+            workers = [
+                self._stage_worker(stage, executor, inbox, outbox) for _ in range(limit)
+            ]
+            await asyncio.gather(*workers)
+
+        await outbox.put(_DONE)
+
+    async def _stage_worker(
+        self,
+        stage: _Stage,
+        executor: ThreadPoolExecutor,
+        inbox: asyncio.Queue,
+        outbox: asyncio.Queue,
+    ) -> None:
+        loop = asyncio.get_running_loop()
+
+        while True:
+            job = await inbox.get()
+            if job is _DONE:
+                # Hand the marker on to the sibling workers of this stage.
+                await inbox.put(_DONE)
+                return
+
+            if job.results is None:
+                try:
+                    await loop.run_in_executor(executor, stage.step, job)
+                except Exception as e:
+                    job.payload = job.source = None
+                    job.results = [{"file_path": str(job.path), "error": str(e)}]
+
+            await outbox.put(job)
+
+    async def _report(self, inbox: asyncio.Queue, slots: List[FileResults]) -> None:
+        while True:
+            job = await inbox.get()
+            if job is _DONE:
+                return
+
+            slots[job.position] = job.results
+
+    def _read(self, job: _Job) -> None:
+        if self.pipeline.plan.excludes(job.path):
+            job.results = []
+            return
+
+        job.source = self.pipeline.extractor.read_source(job.path)
+        if not self.pipeline.may_report(job.source, job.path):
+            self.pipeline.check_syntax(job.source, job.path)
+            job.results, job.source = [], None
+            return
+
+        job.cache_key = self.pipeline.cache_key(job.source, job.path)
+        job.results = self.pipeline.load_cached(job.cache_key, job.path)
+        if job.results is not None:
+            job.source = None
+
+    def _parse(self, job: _Job) -> None:
+        job.payload = self.pipeline.extractor.parse_source(job.source, job.path)
+
+    def _index(self, job: _Job) -> None:
+        tree, module_name = job.payload
+        job.payload = (
+            *self.pipeline.index_tree(tree, module_name, job.path),
+            module_name,
+        )
+
+    def _analyze(self, job: _Job) -> None:
+        index, entities, module_name = job.payload
+        source, job.payload, job.source = job.source, None, None
+        job.results = self.pipeline.analyze(
+            index, entities, job.path, module_name, source
+        )
+        self.pipeline.store_cached(job.cache_key, job.results)
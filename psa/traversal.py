@@ -0,0 +1,120 @@
+import ast
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Final,
+    FrozenSet,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+)
+
+Handler = Callable[[Any], Optional[Iterable[Any]]]
+HandlerTable = Mapping[Type[ast.AST], Handler]
+# (enter, leave)
+HandlerTables = Tuple[Dict[Type[ast.AST], Handler], Dict[Type[ast.AST], Handler]]
+
+
+def _node_types() -> List[Type[ast.AST]]:
+    return [
+        value
+        for value in vars(ast).values()
+        if isinstance(value, type) and issubclass(value, ast.AST)
+    ]
+
+
+# Contexts, operators and the like: nodes without fields, hence without
+# children, that are only worth a stack slot if something handles them.
+LEAF_TYPES: Final[FrozenSet[Type[ast.AST]]] = frozenset(
+    node_type for node_type in _node_types() if not node_type._fields
+)
+
+
+def walk(root: ast.AST, enter: HandlerTable, leave: HandlerTable) -> None:
+    # Depth first, children in field order like ast.NodeVisitor, but driven
+    # by an explicit stack so that the depth of the tree is not limited by
+    # the interpreter's recursion limit. enter[type] runs before a node's
+    # children, leave[type] after them.
+    #
+    # An enter handler may return the items to visit in place of the node's
+    # children: nodes, and (function, argument) pairs that are called when
+    # the walk reaches them, e.g. to note where one child ends.
+    skip = LEAF_TYPES.difference(enter, leave)
+
+    stack: List[Any] = [root]
+    push = stack.append
+    pop = stack.pop
+
+    while stack:
+        node = pop()
+        node_type = type(node)
+
+        # A leave handler queued below the node's children, or a call
+        # scheduled by an enter handler.
+        if node_type is tuple:
+            node[0](node[1])
+            continue
+
+        items = None
+        handler = enter.get(node_type)
+        if handler is not None:
+            items = handler(node)
+
+        handler = leave.get(node_type)
+        if handler is not None:
+            push((handler, node))
+
+        if items is not None:
+            stack.extend(reversed(list(items)))
+            continue
+
+        children: List[ast.AST] = []
+        for name in node._fields:
+            value = getattr(node, name, None)
+            if isinstance(value, list):
+                for item in value:
+                    if isinstance(item, ast.AST) and type(item) not in skip:
+                        children.append(item)
+            elif isinstance(value, ast.AST) and type(value) not in skip:
+                children.append(value)
+
+        children.reverse()
+        stack.extend(children)
+
+
+class Visitor:
+    # Base for visitors driven by walk(). Handlers are methods named
+    # visit_<NodeType>, called before the children of a node, and
+    # leave_<NodeType>, called after them. A visit_ handler may return the
+    # items to visit instead of the node's children, as described in walk().
+    # The tables are resolved once per class rather than per node.
+    _enter_names: Dict[Type[ast.AST], str] = {}
+    _leave_names: Dict[Type[ast.AST], str] = {}
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._enter_names = {}
+        cls._leave_names = {}
+
+        for node_type in _node_types():
+            for prefix, table in (
+                ("visit_", cls._enter_names),
+                ("leave_", cls._leave_names),
+            ):
+                name = prefix + node_type.__name__
+                if callable(getattr(cls, name, None)):
+                    table[node_type] = name
+
+    def handlers(self) -> HandlerTables:
+        # The enter and leave tables of this visitor; subclasses may drop
+        # handlers they do not need for a given walk.
+        enter = {t: getattr(self, name) for t, name in self._enter_names.items()}
+        leave = {t: getattr(self, name) for t, name in self._leave_names.items()}
+        return enter, leave
+
+    def visit(self, node: ast.AST) -> None:
+        walk(node, *self.handlers())
@@ -1,5 +1,5 @@
 import ast
-from typing import List, Optional
+from typing import Callable, List, Optional
 
 from psa.entity import (
     ArgumentEntity,
@@ -10,23 +10,24 @@ from psa.entity import (
     NonlocalDeclEntity,
     VariableEntity,
 )
-from itertools import count
-
 from psa.index.scopes import ClassScope, Scope
 
 
-_node_id_gen = count(1)
-next_node_id = lambda: next(_node_id_gen)  # later move to builders
+# Returns the id of an ast node; asking again for the same node gives the
+# same id.
+NodeIdFactory = Callable[[ast.AST], int]
 
 
-def _convert_args(args_node: ast.arguments) -> List[ArgumentEntity]:
+def _convert_args(
+    args_node: ast.arguments, node_id_of: NodeIdFactory
+) -> List[ArgumentEntity]:
     args: List[ArgumentEntity] = []
 
     for arg in args_node.posonlyargs:
         args.append(
             ArgumentEntity(
                 name=arg.arg,
-                node_id=next_node_id(),
+                node_id=node_id_of(arg),
                 line=arg.lineno,
                 ast_node=arg,
                 annotation=arg.annotation,
@@ -40,7 +41,7 @@ def _convert_args(args_node: ast.arguments) -> List[ArgumentEntity]:
         args.append(
             ArgumentEntity(
                 name=arg.arg,
-                node_id=next_node_id(),
+                node_id=node_id_of(arg),
                 line=arg.lineno,
                 ast_node=arg,
                 annotation=arg.annotation,
@@ -55,7 +56,7 @@ def _convert_args(args_node: ast.arguments) -> List[ArgumentEntity]:
         args.append(
             ArgumentEntity(
                 name=arg.arg,
-                node_id=next_node_id(),
+                node_id=node_id_of(arg),
                 line=arg.lineno,
                 ast_node=arg,
                 annotation=arg.annotation,
@@ -69,7 +70,7 @@ def _convert_args(args_node: ast.arguments) -> List[ArgumentEntity]:
         args.append(
             ArgumentEntity(
                 name=arg.arg,
-                node_id=next_node_id(),
+                node_id=node_id_of(arg),
                 line=arg.lineno,
                 ast_node=arg,
                 annotation=arg.annotation,
@@ -84,7 +85,7 @@ def _convert_args(args_node: ast.arguments) -> List[ArgumentEntity]:
         args.append(
             ArgumentEntity(
                 name=arg.arg,
-                node_id=next_node_id(),
+                node_id=node_id_of(arg),
                 line=arg.lineno,
                 ast_node=arg,
                 annotation=arg.annotation,
@@ -140,15 +141,19 @@ def _convert_import_aliases(names: List[ast.alias]) -> Optional[str]:
     return first.asname if first.asname is not None else first.name
 
 
-def wrap_ast_node(node: ast.AST, parent_scope: Optional[Scope] = None):
+def wrap_ast_node(
+    node: ast.AST,
+    node_id_of: NodeIdFactory,
+    parent_scope: Optional[Scope] = None,
+):
     if isinstance(node, ast.FunctionDef):
         is_method = isinstance(parent_scope, ClassScope)
         return FunctionEntity(
             name=node.name,
-            node_id=next_node_id(),
+            node_id=node_id_of(node),
             line=node.lineno,
             ast_node=node,
-            args=_convert_args(node.args),
+            args=_convert_args(node.args, node_id_of),
             decorators=_convert_decorators(node.decorator_list),
             returns=node.returns,
             is_method=is_method,
@@ -157,7 +162,7 @@ def wrap_ast_node(node: ast.AST, parent_scope: Optional[Scope] = None):
     elif isinstance(node, ast.ClassDef):
         return ClassEntity(
             name=node.name,
-            node_id=next_node_id(),
+            node_id=node_id_of(node),
             line=node.lineno,
             ast_node=node,
             bases=_convert_bases(node.bases),
@@ -168,7 +173,7 @@ def wrap_ast_node(node: ast.AST, parent_scope: Optional[Scope] = None):
     elif isinstance(node, (ast.Import, ast.ImportFrom)):
         return ImportEntity(
             name="import",
-            node_id=next_node_id(),
+            node_id=node_id_of(node),
             line=node.lineno,
             ast_node=node,
             module_name=parent_scope.__module__,
@@ -178,7 +183,7 @@ def wrap_ast_node(node: ast.AST, parent_scope: Optional[Scope] = None):
     elif isinstance(node, ast.arg):
         return ArgumentEntity(
             name=node.arg,
-            node_id=next_node_id(),
+            node_id=node_id_of(node),
             line=node.lineno,
             ast_node=node,
             annotation=None,
@@ -193,7 +198,7 @@ def wrap_ast_node(node: ast.AST, parent_scope: Optional[Scope] = None):
 
         return VariableEntity(
             name=var_name,
-            node_id=next_node_id(),
+            node_id=node_id_of(node),
             line=node.lineno,
             ast_node=node,
             value=node.value,
@@ -202,7 +207,7 @@ def wrap_ast_node(node: ast.AST, parent_scope: Optional[Scope] = None):
     elif isinstance(node, ast.Global):
         return GlobalDeclEntity(
             name="<global>",
-            node_id=next_node_id(),
+            node_id=node_id_of(node),
             names=node.names,
             line=node.lineno,
             ast_node=node,
@@ -211,7 +216,7 @@ def wrap_ast_node(node: ast.AST, parent_scope: Optional[Scope] = None):
     elif isinstance(node, ast.Nonlocal):
         return NonlocalDeclEntity(
             name="<nonlocal>",
-            node_id=next_node_id(),
+            node_id=node_id_of(node),
             names=node.names,
             line=node.lineno,
             ast_node=node,
@@ -0,0 +1,18 @@
+from psa.cache import open_cache
+from psa.config.rules import CacheConfig, Config
+
+
+def test_open_cache_applies_the_configured_size(tmp_path):
+    config = Config(cache=CacheConfig(max_size_mb=2))
+
+    cache = open_cache(config, tmp_path)
+
+    assert cache.directory == tmp_path
+    assert cache.max_size == 2 * 1024 * 1024
+
+
+def test_open_cache_without_directory_follows_the_config():
+    assert open_cache(Config()) is None
+
+    cache = open_cache(Config(cache=CacheConfig(enabled=True, directory="c")))
+    assert cache.directory.name == "c"
@@ -0,0 +1,48 @@
+from psa.config.rules import Config
+from psa.daemon import Daemon, Workspace
+from psa.runner import _warm_pools
+
+
+SOURCE = "class A:\n    def f(self):\n        self.x = 1\n"
+
+
+def _results(workspace):
+    return sorted(
+        (r["file_path"], r["analyzer"], r["node_id"]) for r in workspace.results()
+    )
+
+
+def test_pool_refreshes_match_serial_ones_and_keep_the_pool(tmp_path):
+    for name in ("a.py", "b.py", "c.py"):
+        (tmp_path / name).write_text(SOURCE)
+
+    serial = Workspace(Config(), tmp_path)
+    serial.refresh()
+    pooled = Workspace(Config(), tmp_path, jobs=2)
+    pooled.refresh()
+
+    assert _results(pooled) == _results(serial)
+    pools = list(_warm_pools.values())
+
+    for name in ("a.py", "b.py"):
+        (tmp_path / name).write_text(SOURCE + "\n\nclass B:\n    pass\n")
+    assert len(pooled.refresh()) == 2
+    serial.refresh()
+
+    assert _results(pooled) == _results(serial)
+    assert list(_warm_pools.values()) == pools
+
+
+def test_path_queries_refresh_only_the_named_files(tmp_path):
+    for name in ("a.py", "b.py"):
+        (tmp_path / name).write_text(SOURCE)
+    daemon = Daemon(Workspace(Config(), tmp_path), tmp_path / "psa.sock")
+    daemon.workspace.refresh()
+
+    (tmp_path / "a.py").write_text(SOURCE.replace("A", "B"))
+    (tmp_path / "c.py").write_text(SOURCE)
+    results = daemon._fresh_results({"paths": ["a.py"]})
+
+    assert {r["file_path"] for r in results} == {str(tmp_path.resolve() / "a.py")}
+    assert {r["qualname"] for r in results} == {"B", "B.f"}
+    assert daemon.workspace.status()["files"] == 2
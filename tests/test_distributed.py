@@ -0,0 +1,89 @@
+import multiprocessing
+import os
+from multiprocessing.connection import Client
+from threading import Thread
+
+import pytest
+
+from psa.config.rules import Config
+from psa.distributed import Coordinator, Worker, run_local
+from psa.runner import Runner
+
+
+AUTHKEY = b"psa-test"
+
+SOURCE = (
+    "class A{n}:\n"
+    "    def f(self):\n"
+    "        self.x = {n}\n"
+    "    def g(self):\n"
+    "        return self.x\n"
+    "\n"
+    "def h{n}(items):\n"
+    "    items.append({n})\n"
+)
+
+
+@pytest.fixture
+def tree(tmp_path):
+    for n in range(7):
+        (tmp_path / f"m{n}.py").write_text(SOURCE.format(n=n))
+    return tmp_path
+
+
+def _files(root):
+    return sorted(root.rglob("*.py"))
+
+
+def _serial(root):
+    return Runner(Config(), root, []).run()
+
+
+def _die_mid_batch(address):
+    # Takes a batch and exits without answering, as a killed worker would.
+    conn = Client(address, authkey=AUTHKEY)
+    conn.send(("ready",))
+    conn.recv()
+    os._exit(1)
+
+
+def _start_dying_worker(address):
+    process = multiprocessing.Process(
+        target=_die_mid_batch, args=(address,), daemon=True
+    )
+    process.start()
+    return process
+
+
+def test_run_local_matches_a_serial_run(tree):
+    file_results = run_local(Config(), tree, _files(tree), workers=2, batch_size=2)
+
+    results = [result for results in file_results for result in results]
+    assert results == _serial(tree)
+
+
+def test_batches_of_a_dead_worker_are_reassigned(tree):
+    coordinator = Coordinator(tree, _files(tree), ("127.0.0.1", 0), AUTHKEY, 3)
+    served = []
+
+    def serve():
+        served.extend(coordinator.serve(timeout=30))
+
+    server = Thread(target=serve)
+    server.start()
+
+    dying = _start_dying_worker(coordinator.address)
+    dying.join()
+    assert dying.exitcode == 1
+    Worker(Config(), tree, coordinator.address, AUTHKEY).serve()
+    server.join()
+
+    assert [result for results in served for result in results] == _serial(tree)
+
+
+def test_serve_fails_once_every_worker_has_exited(tree):
+    coordinator = Coordinator(tree, _files(tree), ("127.0.0.1", 0), AUTHKEY, 3)
+    process = _start_dying_worker(coordinator.address)
+
+    with pytest.raises(RuntimeError, match="all workers exited with 3 batches"):
+        coordinator.serve(timeout=30, alive=process.is_alive)
@@ -0,0 +1,24 @@
+import subprocess
+
+import pytest
+
+from psa.git import GitError, ObjectReader
+
+
+def test_missing_spec_with_spaces(tmp_path):
+    (tmp_path / "a.py").write_text("x = 1\n")
+    for args in (
+        ["init", "-q"],
+        ["add", "."],
+        ["-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "init"],
+    ):
+        subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+
+    with ObjectReader(tmp_path) as reader:
+        # "<spec> missing" splits into three fields for a spec with one space.
+        for spec in ("HEAD:./a b", "HEAD:./no such file.py"):
+            with pytest.raises(GitError, match="missing"):
+                reader.read(spec)
+
+        # The reader stays in step with git after the errors.
+        assert reader.read_file("HEAD", "a.py") == b"x = 1\n"
@@ -0,0 +1,55 @@
+import subprocess
+from pathlib import Path
+
+from psa.config.rules import Config, LCOMConfig
+from psa.history import History
+from psa.pipeline import Pipeline
+
+
+SOURCE = (
+    "class A:\n"
+    "    def f(self):\n"
+    "        return self.x\n"
+    "    def g(self):\n"
+    "        return self.x\n"
+)
+
+
+def _repo(root: Path) -> None:
+    for directory in ("pkg", "tests"):
+        (root / directory).mkdir()
+        (root / directory / "a.py").write_text(SOURCE)
+
+    def git(*args: str) -> None:
+        subprocess.run(["git", *args], cwd=root, check=True, capture_output=True)
+
+    git("init", "-q")
+    git("add", ".")
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "init")
+
+
+def _totals(root: Path, config: Config):
+    history = History(Pipeline(config, root), root)
+    try:
+        ((_, totals),) = list(history.run("HEAD", 1))
+    finally:
+        history.close()
+    return totals
+
+
+def test_mean_tcc_without_lcom(tmp_path):
+    _repo(tmp_path)
+    summary = _totals(tmp_path, Config(lcom=LCOMConfig(enabled=False))).summary()
+
+    assert summary["classes"] == 2
+    assert summary["mean_lcom"] == 0.0
+    assert summary["mean_tcc"] == 1.0
+
+
+def test_identical_blobs_under_different_plans(tmp_path):
+    _repo(tmp_path)
+    totals = _totals(tmp_path, Config(lcom=LCOMConfig(ignore=["tests/"])))
+
+    # One blob at both paths, but only pkg/a.py is analyzed for LCOM.
+    assert (totals.lcom_classes, totals.tcc_classes) == (1, 2)
+    assert totals.functions == 4
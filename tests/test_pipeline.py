@@ -0,0 +1,75 @@
+import pytest
+
+from psa.cache import MemoryCache
+from psa.config.rules import Config
+from psa.pipeline import Pipeline
+from psa.runner import EXECUTORS, Runner
+
+
+@pytest.mark.parametrize("executor", EXECUTORS)
+def test_syntax_errors_are_reported_without_markers(tmp_path, executor):
+    # Neither file contains `class` or `def`, so neither is indexed.
+    (tmp_path / "broken.py").write_text("x = (\n")
+    (tmp_path / "fine.py").write_text("x = 1\n")
+
+    config = Config(check_syntax=True)
+    results = Runner(config, tmp_path, [], jobs=2, executor=executor).run()
+
+    assert [(r["file_path"], "error" in r) for r in results] == [
+        (str(tmp_path / "broken.py"), True)
+    ]
+    assert "was never closed" in results[0]["error"]
+
+
+@pytest.mark.parametrize("executor", EXECUTORS)
+def test_files_without_markers_are_not_parsed_by_default(tmp_path, executor):
+    (tmp_path / "broken.py").write_text("x = (\n")
+    (tmp_path / "fine.py").write_text("x = 1\n")
+
+    assert Runner(Config(), tmp_path, [], jobs=2, executor=executor).run() == []
+
+
+BEFORE = (
+    "class A:\n"
+    "    def f(self):\n"
+    "        self.x = 1\n"
+    "\n"
+    "    def g(self):\n"
+    "        return self.x\n"
+    "\n"
+    "\n"
+    "class B:\n"
+    "    def h(self, items):\n"
+    "        items.append(self.y)\n"
+    "\n"
+    "\n"
+    "def top(items):\n"
+    "    items.clear()\n"
+)
+
+
+def test_an_edit_re_analyzes_only_the_entities_it_touches(tmp_path, monkeypatch):
+    # g grows by a line, so B and top move down without changing.
+    after = BEFORE.replace(
+        "        return self.x\n", "        self.z = 2\n        return self.x\n"
+    )
+    file_path = tmp_path / "m.py"
+    pipeline = Pipeline(Config(), tmp_path, cache=MemoryCache())
+    pipeline.process_source(BEFORE.encode(), file_path)
+
+    analyzed = []
+    run_analyzers = Pipeline._run_analyzers
+
+    def spy(self, index, entities, analyzers):
+        analyzed.extend(entity.name for entity in entities)
+        return run_analyzers(self, index, entities, analyzers)
+
+    monkeypatch.setattr(Pipeline, "_run_analyzers", spy)
+    results = pipeline.process_source(after.encode(), file_path)
+
+    # The class contains the edited method, so its cohesion is recomputed.
+    assert sorted(analyzed) == ["A", "g"]
+
+    monkeypatch.undo()
+    uncached = Pipeline(Config(), tmp_path).process_source(after.encode(), file_path)
+    assert results == uncached
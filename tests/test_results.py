@@ -0,0 +1,38 @@
+from pathlib import Path
+
+from psa.config.rules import Config
+from psa.results import merge_results
+from psa.runner import Runner
+
+
+SOURCE = "class A:\n    def f(self):\n        self.x = 1\n"
+
+# Names that sort before "/" as strings but after it as path segments.
+DIRECTORIES = ["a", "a-b", "a.b", "a/c", "a0"]
+
+
+def _tree(root: Path) -> None:
+    for directory in DIRECTORIES:
+        (root / directory).mkdir(parents=True, exist_ok=True)
+        (root / directory / "x.py").write_text(SOURCE)
+
+
+def test_merge_orders_paths_like_the_runner():
+    shards = [
+        [{"file_path": "a-b/x.py"}, {"file_path": "a.b/x.py"}],
+        [{"file_path": "a/x.py"}],
+    ]
+    merged = merge_results(shards)
+    assert [r["file_path"] for r in merged] == ["a/x.py", "a-b/x.py", "a.b/x.py"]
+
+
+def test_merged_shards_equal_unsharded_run(tmp_path):
+    _tree(tmp_path)
+    unsharded = Runner(Config(), tmp_path, []).run()
+
+    for count in range(2, 5):
+        shards = [
+            Runner(Config(), tmp_path, [], shard=(index, count)).run()
+            for index in range(1, count + 1)
+        ]
+        assert merge_results(shards) == unsharded
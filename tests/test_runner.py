@@ -0,0 +1,84 @@
+import subprocess
+
+import pytest
+
+from psa.cache import ResultCache
+from psa.config.rules import Config
+from psa.git import GitError, ObjectReader
+from psa.runner import EXECUTORS, Runner
+
+
+SOURCE = "class A:\n    def f(self):\n        self.x = 1\n"
+
+
+def test_cache_hits_are_not_recorded_as_timings(tmp_path):
+    root = tmp_path / "src"
+    root.mkdir()
+    (root / "a.py").write_text(SOURCE)
+    timings = tmp_path / "timings.json"
+
+    def timing():
+        runner = Runner(
+            Config(), root, [], cache_dir=tmp_path / "cache", timings_path=timings
+        )
+        runner.run()
+        return runner.cost_model.timings
+
+    cold = timing()
+    assert timing() == cold
+
+
+def test_runs_without_writes_do_not_scan_the_cache(tmp_path, monkeypatch):
+    root = tmp_path / "src"
+    root.mkdir()
+    (root / "a.py").write_text(SOURCE)
+    Runner(Config(), root, [], cache_dir=tmp_path / "cache").run()
+
+    scans = []
+    monkeypatch.setattr(ResultCache, "prune", lambda self: scans.append(1) or 0)
+    Runner(Config(), root, [], cache_dir=tmp_path / "cache").run()
+
+    assert scans == []
+
+
+@pytest.mark.parametrize("executor", EXECUTORS)
+def test_every_executor_returns_dicts(tmp_path, executor):
+    for name in ("a.py", "b.py"):
+        (tmp_path / name).write_text(SOURCE)
+
+    results = Runner(Config(), tmp_path, [], jobs=2, executor=executor).run()
+
+    assert results
+    assert all(type(result) is dict for result in results)
+
+
+def _commit(root, source):
+    def git(*args):
+        subprocess.run(["git", *args], cwd=root, check=True, capture_output=True)
+
+    (root / "a.py").write_text(source)
+    git("init", "-q")
+    git("add", ".")
+    git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "base")
+
+
+def test_unparseable_base_versions_count_as_new(tmp_path):
+    _commit(tmp_path, "class A(\n")
+    (tmp_path / "a.py").write_text(SOURCE)
+
+    runner = Runner(Config(), tmp_path, [], changed_since="HEAD")
+    assert runner.run()
+    assert runner.run_base() == []
+
+
+def test_base_read_failures_are_not_hidden(tmp_path, monkeypatch):
+    _commit(tmp_path, SOURCE)
+    (tmp_path / "a.py").write_text(SOURCE.replace("x", "y"))
+    runner = Runner(Config(), tmp_path, [], changed_since="HEAD")
+
+    def fail(self, rev, path):
+        raise GitError("cat-file failed")
+
+    monkeypatch.setattr(ObjectReader, "read_file", fail)
+    with pytest.raises(GitError):
+        runner.run_base()
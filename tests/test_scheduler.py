@@ -0,0 +1,12 @@
+from psa.scheduler import CostModel
+
+
+def test_new_files_are_estimated_from_the_latest_timings(tmp_path):
+    for name, size in (("a.py", 100), ("b.py", 100), ("new.py", 10)):
+        (tmp_path / name).write_bytes(b"#" * size)
+    model = CostModel(tmp_path, {"a.py": (1.0, 100)})
+
+    assert model.estimate(tmp_path / "new.py") == 0.1
+
+    model.record(tmp_path / "b.py", 3.0)
+    assert model.estimate(tmp_path / "new.py") == 0.2